@@ -5,16 +5,95 @@ DATA MANAGER - GESTIONE PERSISTENZA DATI
 Salva e carica addetti e turni da file JSON
 """
 
+from __future__ import annotations
+
 import json
+import logging
+import mmap
 import os
-from datetime import datetime
-from typing import List, Dict, Any
-from gestione_turni import Addetto, Turno
+import re
+from datetime import datetime, date
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict, is_dataclass
+from operator import attrgetter
+from typing import Any, Dict, List, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from gestione_turni import Addetto, Turno
+
+# orjson (parser/serializzatore in Rust) è molto più veloce del modulo json
+# standard; se non è installato si usa il fallback della libreria standard
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Sopra questa soglia di righe la deserializzazione avviene su thread separati;
+# sotto, l'overhead dell'executor supera il guadagno
+_SOGLIA_PARALLELO = 1000
+
+# Cache di caricamento a livello di modulo: TurnoManager costruisce un
+# DataManager nuovo a ogni operazione, quindi una cache legata all'istanza
+# (es. lru_cache su metodo) non sarebbe mai calda e terrebbe in vita istanze
+# e dataset già scartati. La chiave (percorso, mtime_ns, dimensione)
+# identifica una versione precisa del file su disco. In cache finisce solo
+# il JSON parsato (mai toccato dai chiamanti): gli oggetti Addetto/Turno e i
+# contenitori della pianificazione vengono ricostruiti a ogni chiamata,
+# perché il chiamante li muta liberamente e un risultato condiviso
+# corromperebbe la cache.
+_CACHE_MAX = 4
+_cache_caricamento: Dict[tuple, dict] = {}
+
+
+# Fast-path per il parsing delle date ISO-8601: il formato scritto da salva_dati
+# è fisso, quindi un match diretto evita il parser completo datetime.fromisoformat
+# nella quasi totalità dei casi
+_ISO_DATE = re.compile(r'(\d{4})-(\d{2})-(\d{2})$')
+_ISO_DT = re.compile(r'(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})')
+
+# Accessori per la serializzazione riga-per-riga: attrgetter risolve gli
+# accessi agli attributi in C
+_get_addetto = attrgetter('nome', 'ore_contratto', 'ore_max_settimanale',
+                          'straordinario', 'giorni_riposo_sorted', 'ferie_date')
+_TURNO_KEYS = ('nome', 'ora_inizio', 'ora_fine')
+_get_turno = attrgetter(*_TURNO_KEYS)
+
+
+# Righe intermedie con __slots__: niente hash table per riga, orjson le
+# serializza nativamente come oggetti JSON
+@dataclass(slots=True)
+class _AddettoRow:
+    nome: str
+    ore_contratto: float
+    ore_max_settimanale: float
+    straordinario: bool
+    giorni_riposo: tuple
+    ferie_permessi: list
+
+
+@dataclass(slots=True)
+class _TurnoRow:
+    nome: str
+    ora_inizio: str
+    ora_fine: str
+
+
+def _json_default(obj):
+    """Converte i tipi non nativi (date, dataclass) per il fallback json standard"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if is_dataclass(obj):
+        return asdict(obj)
+    raise TypeError(f"Tipo non serializzabile: {type(obj).__name__}")
 
 
 class DataManager:
     """Gestisce il salvataggio e caricamento dei dati"""
 
+    __slots__ = ('nome_file', 'dati', '_turni_index', '_turni_index_turni')
+
     def __init__(self, nome_file: str = "dati_turni.json"):
         """
         Inizializza il DataManager
@@ -23,6 +102,10 @@ class DataManager:
             nome_file: Nome del file JSON per salvare i dati
         """
         self.nome_file = nome_file
+        # Indice {nome: Turno} riusato tra i caricamenti finché la lista turni
+        # non cambia identità
+        self._turni_index = None
+        self._turni_index_turni = None
         self.dati = {
             'addetti': [],
             'turni': [],
@@ -31,7 +114,7 @@ class DataManager:
             'ultimo_aggiornamento': None
         }
 
-    def salva_dati(self, addetti: List[Addetto], turni: List[Turno], pianificazione: Dict = None, turni_richiesti_per_giorno: Dict = None) -> bool:
+    def salva_dati(self, addetti: List[Addetto], turni: List[Turno], pianificazione: Dict = None, turni_richiesti_per_giorno: Dict = None, pretty: bool = False) -> bool:
         """
         Salva addetti, turni e pianificazione nel file JSON
 
@@ -40,6 +123,8 @@ class DataManager:
             turni: Lista di turni
             pianificazione: Dizionario della pianificazione dei turni (opzionale)
             turni_richiesti_per_giorno: Configurazione dei turni richiesti per giorno (opzionale)
+            pretty: Se True indenta il JSON per renderlo leggibile; il default
+                compatto dimezza i byte scritti e riletti
 
         Returns:
             True se il salvataggio è riuscito, False altrimenti
@@ -50,12 +135,28 @@ class DataManager:
                 'turni': self._serializza_turni(turni),
                 'pianificazione': self._serializza_pianificazione(pianificazione) if pianificazione else {},
                 'turni_richiesti_per_giorno': self._serializza_turni_richiesti(turni_richiesti_per_giorno) if turni_richiesti_per_giorno else {},
-                'ultimo_aggiornamento': datetime.now().isoformat()
+                # datetime/date vengono convertiti in ISO-8601 dal serializzatore
+                'ultimo_aggiornamento': datetime.now()
             }
 
-            with open(self.nome_file, 'w', encoding='utf-8') as f:
-                json.dump(dati, f, indent=2, ensure_ascii=False)
-
+            if orjson is not None:
+                opzioni = orjson.OPT_NON_STR_KEYS
+                if pretty:
+                    opzioni |= orjson.OPT_INDENT_2
+                buf = orjson.dumps(dati, option=opzioni)
+            else:
+                buf = json.dumps(dati, indent=2 if pretty else None,
+                                 ensure_ascii=False, default=_json_default).encode('utf-8')
+
+            # Scrittura atomica: il payload viene serializzato una sola volta in
+            # memoria, scritto con un'unica write su file temporaneo e poi
+            # sostituito con os.replace (nessun file parziale in caso di crash)
+            file_tmp = self.nome_file + '.tmp'
+            with open(file_tmp, 'wb') as f:
+                f.write(buf)
+            os.replace(file_tmp, self.nome_file)
+
+            self.invalidate_cache()
             return True
         except Exception as e:
             print(f"Errore durante il salvataggio: {e}")
@@ -68,43 +169,93 @@ class DataManager:
         Returns:
             Tupla (addetti, turni, pianificazione, turni_richiesti_per_giorno) se il caricamento è riuscito, ([], [], {}, {}) altrimenti
         """
-        if not os.path.exists(self.nome_file):
+        try:
+            # Un solo stat copre sia il controllo di esistenza sia la chiave di
+            # cache: se (mtime_ns, dimensione) non cambiano il file non viene
+            # riletto né riparsato
+            st = os.stat(self.nome_file)
+        except OSError:
             return [], [], {}, {}
 
+        chiave = (self.nome_file, st.st_mtime_ns, st.st_size)
         try:
-            with open(self.nome_file, 'r', encoding='utf-8') as f:
-                dati = json.load(f)
-
-            addetti = self._deserializza_addetti(dati.get('addetti', []))
-            turni = self._deserializza_turni(dati.get('turni', []))
-            pianificazione = self._deserializza_pianificazione(dati.get('pianificazione', {}), turni)
-            turni_richiesti_per_giorno = self._deserializza_turni_richiesti(dati.get('turni_richiesti_per_giorno', {}))
-
-            return addetti, turni, pianificazione, turni_richiesti_per_giorno
+            dati = _cache_caricamento.get(chiave)
+            if dati is None:
+                dati = self._leggi_json()
+                # Sfratto FIFO: con un solo file dati bastano poche versioni
+                while len(_cache_caricamento) >= _CACHE_MAX:
+                    del _cache_caricamento[next(iter(_cache_caricamento))]
+                _cache_caricamento[chiave] = dati
+            # Oggetti freschi a ogni chiamata: solo il parsing viene risparmiato
+            return self._costruisci_oggetti(dati)
         except Exception as e:
             print(f"Errore durante il caricamento: {e}")
             return [], [], {}, {}
 
-    def _serializza_addetti(self, addetti: List[Addetto]) -> List[Dict[str, Any]]:
+    def _leggi_json(self) -> dict:
+        """Legge e parsa il file JSON dal disco (senza passare dalla cache)"""
+        if orjson is not None:
+            # orjson accetta bytes nativamente, evitando la decodifica UTF-8.
+            # Per file grandi un mmap evita anche la copia fatta da f.read();
+            # sotto i 64 KiB l'overhead di mmap supera il beneficio.
+            with open(self.nome_file, 'rb') as f:
+                if os.fstat(f.fileno()).st_size >= 64 * 1024:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        dati = orjson.loads(memoryview(mm))
+                else:
+                    dati = orjson.loads(f.read())
+        else:
+            with open(self.nome_file, 'r', encoding='utf-8') as f:
+                dati = json.load(f)
+        return dati
+
+    def _costruisci_oggetti(self, dati: dict) -> tuple:
+        """Costruisce addetti, turni e pianificazione dal JSON parsato.
+
+        I deserializzatori leggono soltanto `dati`, quindi lo stesso dict
+        in cache può essere riusato da chiamate successive."""
+        dati_addetti = dati.get('addetti', [])
+        dati_turni = dati.get('turni', [])
+        dati_pianificazione = dati.get('pianificazione', {})
+
+        if len(dati_addetti) + len(dati_pianificazione) > _SOGLIA_PARALLELO:
+            # Le tre deserializzazioni sono indipendenti (la pianificazione
+            # dipende solo dai turni): addetti e pianificazione possono
+            # procedere in parallelo
+            with ThreadPoolExecutor(max_workers=3) as executor:
+                future_addetti = executor.submit(self._deserializza_addetti, dati_addetti)
+                future_turni = executor.submit(self._deserializza_turni, dati_turni)
+                turni = future_turni.result()
+                future_pianificazione = executor.submit(
+                    self._deserializza_pianificazione, dati_pianificazione, turni)
+                addetti = future_addetti.result()
+                pianificazione = future_pianificazione.result()
+        else:
+            addetti = self._deserializza_addetti(dati_addetti)
+            turni = self._deserializza_turni(dati_turni)
+            pianificazione = self._deserializza_pianificazione(dati_pianificazione, turni)
+
+        turni_richiesti_per_giorno = self._deserializza_turni_richiesti(dati.get('turni_richiesti_per_giorno', {}))
+
+        return addetti, turni, pianificazione, turni_richiesti_per_giorno
+
+    def invalidate_cache(self):
+        """Scarta dalla cache le versioni di questo file (da chiamare dopo ogni scrittura)"""
+        for chiave in [c for c in _cache_caricamento if c[0] == self.nome_file]:
+            _cache_caricamento.pop(chiave, None)
+
+    def _serializza_addetti(self, addetti: List[Addetto]) -> List[_AddettoRow]:
         """Serializza gli addetti in formato JSON"""
-        risultato = []
-
-        for addetto in addetti:
-            dati_addetto = {
-                'nome': addetto.nome,
-                'ore_contratto': addetto.ore_contratto,
-                'ore_max_settimanale': addetto.ore_max_settimanale,
-                'straordinario': addetto.straordinario,
-                'giorni_riposo': sorted(list(addetto.giorni_riposo)),
-                'ferie_permessi': [d.isoformat() for d in addetto.ferie_permessi]
-            }
-            risultato.append(dati_addetto)
-
-        return risultato
+        return [_AddettoRow(*_get_addetto(addetto)) for addetto in addetti]
 
     def _deserializza_addetti(self, dati: List[Dict[str, Any]]) -> List[Addetto]:
         """Deserializza gli addetti dal formato JSON"""
+        # Import pigro: chi usa solo esiste_file_dati/elimina_dati non paga
+        # il costo di caricare il motore di pianificazione
+        from gestione_turni import Addetto
+
         risultato = []
+        n_errori = 0
 
         for dati_addetto in dati:
             try:
@@ -115,43 +266,44 @@ class DataManager:
                     straordinario=dati_addetto['straordinario']
                 )
 
-                # Aggiungi giorni di riposo
-                for giorno in dati_addetto.get('giorni_riposo', []):
-                    addetto.aggiungi_giorno_riposo(giorno)
+                # Giorni di riposo e ferie vengono applicati in blocco invece
+                # che con una chiamata di metodo per elemento
+                addetto._set_giorni_riposo(dati_addetto.get('giorni_riposo', ()))
 
-                # Aggiungi ferie
+                ferie = []
                 for feria_str in dati_addetto.get('ferie_permessi', []):
                     try:
-                        feria = datetime.fromisoformat(feria_str).date()
-                        addetto.aggiungi_ferie(feria)
+                        m = _ISO_DATE.match(feria_str)
+                        if m:
+                            ferie.append(date(int(m[1]), int(m[2]), int(m[3])))
+                        else:
+                            ferie.append(datetime.fromisoformat(feria_str).date())
                     except ValueError:
                         # Ignora date non valide
                         pass
+                addetto._set_ferie(ferie)
 
                 risultato.append(addetto)
             except Exception as e:
-                print(f"Errore nel caricamento addetto: {e}")
+                logger.debug("Errore nel caricamento addetto: %s", e)
+                n_errori += 1
                 continue
 
+        if n_errori:
+            logger.warning("Saltati %d addetti non validi", n_errori)
+
         return risultato
 
-    def _serializza_turni(self, turni: List[Turno]) -> List[Dict[str, Any]]:
+    def _serializza_turni(self, turni: List[Turno]) -> List[_TurnoRow]:
         """Serializza i turni in formato JSON"""
-        risultato = []
-
-        for turno in turni:
-            dati_turno = {
-                'nome': turno.nome,
-                'ora_inizio': turno.ora_inizio,
-                'ora_fine': turno.ora_fine
-            }
-            risultato.append(dati_turno)
-
-        return risultato
+        return [_TurnoRow(*_get_turno(turno)) for turno in turni]
 
     def _deserializza_turni(self, dati: List[Dict[str, Any]]) -> List[Turno]:
         """Deserializza i turni dal formato JSON"""
+        from gestione_turni import Turno
+
         risultato = []
+        n_errori = 0
 
         for dati_turno in dati:
             try:
@@ -162,9 +314,13 @@ class DataManager:
                 )
                 risultato.append(turno)
             except Exception as e:
-                print(f"Errore nel caricamento turno: {e}")
+                logger.debug("Errore nel caricamento turno: %s", e)
+                n_errori += 1
                 continue
 
+        if n_errori:
+            logger.warning("Saltati %d turni non validi", n_errori)
+
         return risultato
 
     def _serializza_pianificazione(self, pianificazione: Dict) -> Dict:
@@ -177,19 +333,14 @@ class DataManager:
         if not pianificazione:
             return {}
 
-        risultato = {}
-        for data, assegnazioni in pianificazione.items():
-            # Converte la data datetime in stringa ISO
-            data_str = data.isoformat()
-            assegnazioni_serializzate = {}
-
-            for nome_addetto, turno in assegnazioni.items():
-                # Salva solo il nome del turno (il turno completo può essere recuperato dalla lista turni)
-                assegnazioni_serializzate[nome_addetto] = turno.nome if hasattr(turno, 'nome') else str(turno)
-
-            risultato[data_str] = assegnazioni_serializzate
-
-        return risultato
+        # Salva solo il nome del turno (il turno completo può essere recuperato
+        # dalla lista turni). orjson serializza le chiavi datetime nativamente
+        # (OPT_NON_STR_KEYS); il fallback json standard richiede chiavi stringa.
+        if orjson is not None:
+            return {data: {nome: turno.nome for nome, turno in assegnazioni.items()}
+                    for data, assegnazioni in pianificazione.items()}
+        return {data.isoformat(): {nome: turno.nome for nome, turno in assegnazioni.items()}
+                for data, assegnazioni in pianificazione.items()}
 
     def _deserializza_pianificazione(self, dati: Dict, turni: List[Turno]) -> Dict:
         """
@@ -200,27 +351,49 @@ class DataManager:
         if not dati:
             return {}
 
-        # Crea un dizionario per cercare rapidamente turni per nome
-        turni_per_nome = {turno.nome: turno for turno in turni}
+        # Crea un dizionario per cercare rapidamente turni per nome,
+        # riusandolo finché la lista turni non cambia identità
+        if self._turni_index is None or self._turni_index_turni is not turni:
+            self._turni_index = {turno.nome: turno for turno in turni}
+            self._turni_index_turni = turni
+        turni_per_nome = self._turni_index
 
         risultato = {}
+        n_errori = 0
         for data_str, assegnazioni in dati.items():
             try:
-                # Converte la stringa ISO in datetime
-                data = datetime.fromisoformat(data_str)
-                assegnazioni_deserializzate = {}
-
-                for nome_addetto, nome_turno in assegnazioni.items():
-                    # Recupera l'oggetto Turno dal dizionario
-                    if nome_turno in turni_per_nome:
-                        assegnazioni_deserializzate[nome_addetto] = turni_per_nome[nome_turno]
+                # Converte la stringa ISO in datetime. Le chiavi devono restare
+                # datetime (non date): la pianificazione viene interrogata con i
+                # datetime prodotti da get_giorni_mese. Le chiavi in forma
+                # solo-data vengono ricostruite come datetime a mezzanotte.
+                m = _ISO_DT.match(data_str)
+                if m:
+                    data = datetime(int(m[1]), int(m[2]), int(m[3]),
+                                    int(m[4]), int(m[5]), int(m[6]))
+                else:
+                    m = _ISO_DATE.match(data_str)
+                    if m:
+                        data = datetime(int(m[1]), int(m[2]), int(m[3]))
+                    else:
+                        data = datetime.fromisoformat(data_str)
+                # Recupera gli oggetti Turno dal dizionario; la comprehension
+                # costruisce il dict in un solo passaggio senza resize incrementali
+                assegnazioni_deserializzate = {
+                    nome_addetto: turni_per_nome[nome_turno]
+                    for nome_addetto, nome_turno in assegnazioni.items()
+                    if nome_turno in turni_per_nome
+                }
 
                 if assegnazioni_deserializzate:
                     risultato[data] = assegnazioni_deserializzate
             except (ValueError, KeyError) as e:
-                print(f"Errore nel caricamento pianificazione per {data_str}: {e}")
+                logger.debug("Errore nel caricamento pianificazione per %s: %s", data_str, e)
+                n_errori += 1
                 continue
 
+        if n_errori:
+            logger.warning("Saltati %d giorni di pianificazione non validi", n_errori)
+
         return risultato
 
     def elimina_dati(self) -> bool:
@@ -228,6 +401,7 @@ class DataManager:
         try:
             if os.path.exists(self.nome_file):
                 os.remove(self.nome_file)
+            self.invalidate_cache()
             return True
         except Exception as e:
             print(f"Errore durante l'eliminazione: {e}")
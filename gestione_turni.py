@@ -6,15 +6,68 @@ Programma per la pianificazione dei turni settimanali/mensili del personale
 Scritto in Python con interfaccia a menu interattivo
 """
 
-from datetime import datetime, timedelta, date
+from datetime import datetime, date
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
+import io
 import os
-import json
+import sys
 import calendar
-from typing import List, Dict, Set, Tuple
-import random
+from contextlib import redirect_stdout
+from functools import lru_cache
+from typing import List, Dict
+
+# OR-Tools CP-SAT è opzionale: se disponibile, la pianificazione usa il solver
+# a vincoli (nativo, molto più veloce e con garanzie di fattibilità); in caso
+# contrario resta l'euristica greedy in puro Python
+try:
+    from ortools.sat.python import cp_model
+except ImportError:
+    cp_model = None
+
+# Nomi italiani di mesi e giorni come costanti di modulo: evita di ricostruire
+# la lista a ogni chiamata (una per riga nel loop di export)
+_NOMI_MESE = (
+    "Gennaio", "Febbraio", "Marzo", "Aprile", "Maggio", "Giugno",
+    "Luglio", "Agosto", "Settembre", "Ottobre", "Novembre", "Dicembre"
+)
+_NOMI_GIORNO = ("Lunedì", "Martedì", "Mercoledì", "Giovedì", "Venerdì", "Sabato", "Domenica")
+
+# Separatore standard delle viste testuali, costruito una volta sola
+_SEP = "=" * 60
+
+# Oggetti di stile condivisi per l'export Excel: openpyxl deduplica gli stili
+# per hash, ma ricostruirli per ogni cella costa comunque allocazioni e hashing
+
+
+@lru_cache(maxsize=None)
+def _fill(colore: str) -> PatternFill:
+    """Restituisce (memoizzato) il riempimento pieno per un colore RGB"""
+    return PatternFill(start_color=colore, end_color=colore, fill_type="solid")
+
+
+_FILL_FESTIVO = _fill("FFCCCC")
+_FILL_DOMENICA = _fill("FFFFCC")
+_FILL_NEUTRO = _fill("FFFFFF")
+_FILL_HEADER = _fill("366092")
+_FONT_HEADER = Font(bold=True, color="FFFFFF")
+_FONT_TITOLO = Font(bold=True, size=14)
+_FONT_BOLD = Font(bold=True)
+_ALIGN_WRAP = Alignment(wrap_text=True, vertical="center")
+
+
+def _cella_stile(ws, valore, font=None, fill=None, alignment=None):
+    """Crea una WriteOnlyCell con gli stili indicati già applicati"""
+    cella = WriteOnlyCell(ws, value=valore)
+    if font is not None:
+        cella.font = font
+    if fill is not None:
+        cella.fill = fill
+    if alignment is not None:
+        cella.alignment = alignment
+    return cella
 
 
 class Addetto:
@@ -57,63 +110,110 @@ class Addetto:
         self.ore_contratto = ore_contratto  # MINIMO settimanale
         self.ore_max_settimanale = ore_max_settimanale  # MASSIMO settimanale
         self.straordinario = straordinario
-        # Traccia ore realizzate per settimana: {numero_settimana: ore}
-        self.ore_per_settimana = {}
+        # Minuti realizzati per settimana ISO, in un array a dimensione fissa
+        # indicizzato per offset dalla prima settimana: accesso diretto senza
+        # hashing nel loop di pianificazione (un mese copre al più ~6 settimane).
+        # La vista {settimana: minuti} resta disponibile via ore_per_settimana.
+        self._ore_week: List[int] = []
+        self._first_week = 0
         self.giorni_riposo = set()  # giorni della settimana (0=lunedì, 6=domenica)
-        self.ferie_permessi = []  # lista di date
+        self._giorni_riposo_sorted = None  # cache della versione ordinata
+        self._riposo_mask = 0  # bitmask dei giorni di riposo (bit n = giorno n)
+        self.ferie_permessi = set()  # ordinali (date.toordinal) delle date di ferie
         self.turni_assegnati = {}  # {data: turno}
 
     def aggiungi_giorno_riposo(self, giorno: int):
         """Aggiunge un giorno di riposo settimanale (0=lunedì, 6=domenica)"""
         self.giorni_riposo.add(giorno)
+        self._giorni_riposo_sorted = None
+        self._riposo_mask |= 1 << giorno
 
     def rimuovi_giorno_riposo(self, giorno: int):
         """Rimuove un giorno di riposo settimanale"""
         if giorno in self.giorni_riposo:
             self.giorni_riposo.remove(giorno)
+            self._giorni_riposo_sorted = None
+            self._riposo_mask &= ~(1 << giorno)
+
+    def _set_giorni_riposo(self, giorni):
+        """Sostituisce in blocco i giorni di riposo (usato dal caricamento dati)"""
+        self.giorni_riposo = set(giorni)
+        self._giorni_riposo_sorted = None
+        self._riposo_mask = sum(1 << g for g in self.giorni_riposo)
+
+    def _set_ferie(self, ferie):
+        """Sostituisce in blocco le date di ferie/permesso (usato dal caricamento dati)"""
+        self.ferie_permessi = {d.toordinal() for d in ferie}
+
+    @property
+    def giorni_riposo_sorted(self) -> tuple:
+        """Giorni di riposo ordinati, ricalcolati solo dopo una modifica"""
+        if self._giorni_riposo_sorted is None:
+            self._giorni_riposo_sorted = tuple(sorted(self.giorni_riposo))
+        return self._giorni_riposo_sorted
 
     def aggiungi_ferie(self, data: date):
         """Aggiunge una data di ferie/permesso"""
-        # Ensure data is a date object, not datetime
-        if isinstance(data, datetime):
-            data = data.date()
-        if data not in self.ferie_permessi:
-            self.ferie_permessi.append(data)
+        # toordinal() è identico per date e datetime dello stesso giorno
+        self.ferie_permessi.add(data.toordinal())
 
     def rimuovi_ferie(self, data: date):
         """Rimuove una data di ferie/permesso"""
-        # Ensure data is a date object, not datetime
-        if isinstance(data, datetime):
-            data = data.date()
-        if data in self.ferie_permessi:
-            self.ferie_permessi.remove(data)
+        self.ferie_permessi.discard(data.toordinal())
+
+    @property
+    def ferie_date(self) -> List[date]:
+        """Date di ferie/permesso ordinate, ricostruite dagli ordinali"""
+        return [date.fromordinal(ordinale) for ordinale in sorted(self.ferie_permessi)]
 
     def puo_lavorare(self, data: datetime) -> bool:
         """Verifica se l'addetto può lavorare in una data specifica"""
-        # Controlla se è un giorno di riposo settimanale
-        if data.weekday() in self.giorni_riposo:
+        # Giorno di riposo settimanale: test branchless sulla bitmask
+        if (1 << data.weekday()) & self._riposo_mask:
             return False
 
-        # Controlla se è in ferie/permesso
-        if data in self.ferie_permessi:
+        # Ferie/permesso: confronto O(1) sul set di ordinali
+        if data.toordinal() in self.ferie_permessi:
             return False
 
         return True
 
-    def get_ore_settimana(self, numero_settimana: int) -> float:
-        """Restituisce le ore realizzate in una settimana specifica"""
-        return self.ore_per_settimana.get(numero_settimana, 0)
-
-    def add_ore_settimana(self, numero_settimana: int, ore: float):
-        """Aggiunge ore realizzate in una settimana specifica"""
-        if numero_settimana not in self.ore_per_settimana:
-            self.ore_per_settimana[numero_settimana] = 0
-        self.ore_per_settimana[numero_settimana] += ore
-
-    def puo_aggiungere_ore_settimana(self, numero_settimana: int, ore: float) -> bool:
-        """Verifica se può aggiungere altre ore in una settimana senza superare il massimo"""
-        ore_attuali = self.get_ore_settimana(numero_settimana)
-        return (ore_attuali + ore) <= self.ore_max_settimanale
+    @property
+    def ore_per_settimana(self) -> Dict[int, int]:
+        """Vista {numero_settimana: minuti} compatibile con il vecchio dict"""
+        return {self._first_week + indice: minuti
+                for indice, minuti in enumerate(self._ore_week) if minuti}
+
+    def _init_settimane(self, prima_settimana: int, n_settimane: int):
+        """Azzera e pre-dimensiona l'array dei minuti per settimana"""
+        self._first_week = prima_settimana
+        self._ore_week = [0] * n_settimane
+
+    def get_ore_settimana(self, numero_settimana: int) -> int:
+        """Restituisce i minuti realizzati in una settimana specifica"""
+        indice = numero_settimana - self._first_week
+        if 0 <= indice < len(self._ore_week):
+            return self._ore_week[indice]
+        return 0
+
+    def add_ore_settimana(self, numero_settimana: int, minuti: int):
+        """Aggiunge minuti realizzati in una settimana specifica"""
+        if not self._ore_week:
+            self._first_week = numero_settimana
+        indice = numero_settimana - self._first_week
+        if indice < 0:
+            # Settimana precedente alla prima vista: estende in testa
+            self._ore_week[:0] = [0] * -indice
+            self._first_week = numero_settimana
+            indice = 0
+        elif indice >= len(self._ore_week):
+            self._ore_week.extend([0] * (indice - len(self._ore_week) + 1))
+        self._ore_week[indice] += minuti
+
+    def puo_aggiungere_ore_settimana(self, numero_settimana: int, minuti: int) -> bool:
+        """Verifica se può aggiungere altri minuti in una settimana senza superare il massimo"""
+        minuti_attuali = self.get_ore_settimana(numero_settimana)
+        return (minuti_attuali + minuti) <= self.ore_max_settimanale * 60
 
     def __repr__(self):
         return f"Addetto({self.nome}, {self.ore_contratto}h min, max {self.ore_max_settimanale}h/settimana)"
@@ -138,16 +238,20 @@ class Turno:
         if not nome or not isinstance(nome, str):
             raise ValueError("Nome turno deve essere una stringa non vuota")
 
-        # Validazione formato ore
-        self._valida_orario(ora_inizio, "ora_inizio")
-        self._valida_orario(ora_fine, "ora_fine")
+        # Validazione formato ore; la validazione restituisce anche i minuti
+        # dalla mezzanotte, così ogni orario viene analizzato una volta sola
+        self.ora_inizio_min = self._valida_orario(ora_inizio, "ora_inizio")
+        self.ora_fine_min = self._valida_orario(ora_fine, "ora_fine")
 
         self.nome = nome
         self.ora_inizio = ora_inizio
         self.ora_fine = ora_fine
-        self.ore = self._calcola_ore()
 
-    def _valida_orario(self, orario: str, nome_campo: str):
+        self.ore_minuti = self.ora_fine_min - self.ora_inizio_min
+        if self.ore_minuti < 0:
+            self.ore_minuti += 24 * 60  # Se il turno va oltre la mezzanotte
+
+    def _valida_orario(self, orario: str, nome_campo: str) -> int:
         """
         Valida che l'orario sia in formato HH:MM con valori corretti
 
@@ -155,6 +259,9 @@ class Turno:
             orario: Stringa orario da validare
             nome_campo: Nome del campo per il messaggio di errore
 
+        Returns:
+            I minuti dalla mezzanotte corrispondenti all'orario
+
         Raises:
             ValueError: Se l'orario non è valido
         """
@@ -179,39 +286,58 @@ class Turno:
         if not (0 <= minuti <= 59):
             raise ValueError(f"{nome_campo}: minuti deve essere tra 0 e 59")
 
-    def _calcola_ore(self) -> int:
-        """Calcola le ore del turno"""
-        # Converte le ore in formato 24h per il calcolo
-        h_inizio, m_inizio = map(int, self.ora_inizio.split(':'))
-        h_fine, m_fine = map(int, self.ora_fine.split(':'))
-
-        ore_inizio = h_inizio + m_inizio / 60
-        ore_fine = h_fine + m_fine / 60
-
-        if ore_fine < ore_inizio:
-            ore_fine += 24  # Se il turno va oltre la mezzanotte
+        return ore * 60 + minuti
 
-        return ore_fine - ore_inizio
+    @property
+    def ore(self) -> float:
+        """Durata del turno in ore, solo per visualizzazione"""
+        return self.ore_minuti / 60
 
     def __repr__(self):
         return f"Turno({self.nome}, {self.ora_inizio}-{self.ora_fine}, {self.ore}h)"
 
 
+def _build_festivi_bitmap(festivi) -> bytes:
+    """Costruisce la bitmap dei festivi indicizzata per mese*32 + giorno"""
+    bitmap = bytearray(13 * 32)
+    for mese, giorno in festivi:
+        bitmap[mese * 32 + giorno] = 1
+    return bytes(bitmap)
+
+
 class TurnoManager:
     """Classe principale per la gestione della pianificazione dei turni"""
 
-    # Giorni festivi (non lavorativi)
-    GIORNI_FESTIVI = [
+    # Giorni festivi (non lavorativi): frozenset immutabile, appartenenza O(1)
+    GIORNI_FESTIVI = frozenset({
         (1, 1),      # 1 gennaio
         (4, 20),     # 20 aprile
         (5, 1),      # 1 maggio
         (12, 25),    # 25 dicembre
         (12, 26),    # 26 dicembre
-    ]
+    })
+
+    # Bitmap precalcolata: is_festivo diventa un accesso a bytes invece di una
+    # scansione lineare della lista (l'indice mese*32+giorno è indipendente
+    # dagli anni bisestili, a differenza del giorno dell'anno)
+    _FESTIVI_BITMAP = _build_festivi_bitmap(GIORNI_FESTIVI)
 
     def __init__(self):
         self.addetti: List[Addetto] = []
         self.turni: List[Turno] = []
+        # Indici per nome affiancati alle liste: deduplicazione e rimozione
+        # in O(1) invece della scansione lineare della lista
+        self._addetti_by_name: Dict[str, Addetto] = {}
+        self._turni_by_name: Dict[str, Turno] = {}
+        # Cache lazy dei nomi in minuscolo per i controlli
+        # case-insensitive di menu e GUI; invalidate a ogni mutazione
+        self._nomi_turni_lc = None
+        self._nomi_addetti_lc = None
+        # Cache dei giorni lavorativi, con chiave (mese, anno): il confronto
+        # sulla chiave la invalida da solo quando il mese viene cambiato
+        self._giorni_mese_cache = None
+        # Cache della classificazione dei giorni, stessa chiave (mese, anno)
+        self._classifica_giorni_cache = None
         self.mese = datetime.now().month
         self.anno = datetime.now().year
         self.pianificazione = {}  # {data: {addetto: turno}}
@@ -248,6 +374,11 @@ class TurnoManager:
                 return False
 
             self.addetti, self.turni, self.pianificazione, self.turni_richiesti_per_giorno = data_manager.carica_dati()
+            # Riallinea gli indici per nome con le liste appena caricate
+            self._addetti_by_name = {a.nome: a for a in self.addetti}
+            self._turni_by_name = {t.nome: t for t in self.turni}
+            self._nomi_turni_lc = None
+            self._nomi_addetti_lc = None
             return True
         except ImportError:
             print("Errore: modulo data_manager non trovato")
@@ -255,33 +386,55 @@ class TurnoManager:
 
     def is_festivo(self, data: datetime) -> bool:
         """Verifica se una data è festiva"""
-        return (data.month, data.day) in self.GIORNI_FESTIVI
+        return bool(self._FESTIVI_BITMAP[data.month * 32 + data.day])
 
     def is_domenica(self, data: datetime) -> bool:
         """Verifica se una data è domenica"""
         return data.weekday() == 6
 
-    def get_giorni_mese(self) -> List[datetime]:
-        """Restituisce tutti i giorni lavorativi del mese"""
+    def iter_giorni_mese(self):
+        """Genera i giorni lavorativi del mese (festivi esclusi), in ordine"""
         _, num_giorni = calendar.monthrange(self.anno, self.mese)
-        giorni = []
 
         for giorno in range(1, num_giorni + 1):
             data = datetime(self.anno, self.mese, giorno)
             # Esclude giorni festivi
             if not self.is_festivo(data):
-                giorni.append(data)
+                yield data
 
-        return giorni
+    def get_giorni_mese(self) -> List[datetime]:
+        """Restituisce tutti i giorni lavorativi del mese (memoizzati)"""
+        chiave = (self.mese, self.anno)
+        if self._giorni_mese_cache is None or self._giorni_mese_cache[0] != chiave:
+            self._giorni_mese_cache = (chiave, list(self.iter_giorni_mese()))
+        return self._giorni_mese_cache[1]
+
+    def classifica_giorni(self) -> Dict[datetime, str]:
+        """
+        Classifica i giorni lavorativi del mese per le viste testuali.
+
+        Restituisce {data: etichetta} con etichetta "[FESTIVO]", "[DOMENICA]"
+        o stringa vuota; memoizzata con chiave (mese, anno) come i giorni.
+        """
+        chiave = (self.mese, self.anno)
+        if self._classifica_giorni_cache is None or self._classifica_giorni_cache[0] != chiave:
+            classifica = {}
+            for data in self.get_giorni_mese():
+                if self.is_festivo(data):
+                    classifica[data] = "[FESTIVO]"
+                elif data.weekday() == 6:
+                    classifica[data] = "[DOMENICA]"
+                else:
+                    classifica[data] = ""
+            self._classifica_giorni_cache = (chiave, classifica)
+        return self._classifica_giorni_cache[1]
 
     def get_settimane_mese(self) -> Dict[int, List[datetime]]:
         """Restituisce le settimane del mese con i loro giorni"""
         # Una settimana inizia lunedì (0) e finisce domenica (6)
-        giorni = self.get_giorni_mese()
         settimane = {}
-        settimana_attuale = None
 
-        for data in giorni:
+        for data in self.iter_giorni_mese():
             # Numero della settimana ISO (1-53)
             num_settimana = data.isocalendar()[1]
 
@@ -298,29 +451,49 @@ class TurnoManager:
 
     def aggiungi_addetto(self, addetto: Addetto):
         """Aggiunge un addetto alla lista"""
-        if addetto not in self.addetti:
+        if addetto.nome not in self._addetti_by_name:
+            self._addetti_by_name[addetto.nome] = addetto
             self.addetti.append(addetto)
+            self._nomi_addetti_lc = None
 
     def rimuovi_addetto(self, nome: str):
         """Rimuove un addetto dalla lista"""
-        self.addetti = [a for a in self.addetti if a.nome != nome]
+        if self._addetti_by_name.pop(nome, None) is not None:
+            self.addetti = [a for a in self.addetti if a.nome != nome]
+            self._nomi_addetti_lc = None
 
     def aggiungi_turno(self, turno: Turno):
         """Aggiunge un tipo di turno disponibile"""
-        if turno not in self.turni:
+        if turno.nome not in self._turni_by_name:
+            self._turni_by_name[turno.nome] = turno
             self.turni.append(turno)
+            self._nomi_turni_lc = None
 
     def rimuovi_turno(self, nome: str):
         """Rimuove un tipo di turno"""
-        self.turni = [t for t in self.turni if t.nome != nome]
+        if self._turni_by_name.pop(nome, None) is not None:
+            self.turni = [t for t in self.turni if t.nome != nome]
+            self._nomi_turni_lc = None
+
+    def nomi_turni_lower(self) -> frozenset:
+        """Nomi dei turni in minuscolo, per appartenenza case-insensitive O(1)"""
+        if self._nomi_turni_lc is None:
+            self._nomi_turni_lc = frozenset(t.nome.lower() for t in self.turni)
+        return self._nomi_turni_lc
+
+    def nomi_addetti_lower(self) -> frozenset:
+        """Nomi degli addetti in minuscolo, per appartenenza case-insensitive O(1)"""
+        if self._nomi_addetti_lc is None:
+            self._nomi_addetti_lc = frozenset(a.nome.lower() for a in self.addetti)
+        return self._nomi_addetti_lc
 
     def pianifica_turni(self):
         """
-        Algoritmo di pianificazione dei turni con matrice giorno x addetto.
-        Assegna MASSIMO 1 turno per addetto per giorno.
+        Pianifica i turni del mese. Assegna MASSIMO 1 turno per addetto per giorno.
 
-        Fase 1: Pianificazione Bilanciata - assegna i turni richiesti agli addetti con meno ore nella settimana
-        Fase 2: Verifica ore minime - assicura che ogni addetto raggiunga ore_contratto minime
+        Se OR-Tools è installato usa un modello CP-SAT (variabili booleane
+        addetto x giorno x turno con vincoli lineari); altrimenti ripiega
+        sull'euristica greedy in puro Python.
         """
         giorni = self.get_giorni_mese()
 
@@ -328,165 +501,270 @@ class TurnoManager:
             print("Errore: Aggiungere almeno un addetto e un turno")
             return False
 
-        # Reset dei turni assegnati
+        self.pianificazione = {giorno: {} for giorno in giorni}
+
+        # Numeri di settimana ISO calcolati una volta sola: isocalendar()
+        # alloca una named tuple a ogni chiamata e i planner li consultano
+        # ripetutamente per ogni giorno
+        settimane = [data.isocalendar()[1] for data in giorni]
+        prima_settimana = min(settimane)
+        n_settimane = max(settimane) - prima_settimana + 1
+
+        # Reset dei turni assegnati, con array settimanale già dimensionato
         for addetto in self.addetti:
             addetto.turni_assegnati = {}
-            addetto.ore_per_settimana = {}
+            addetto._init_settimane(prima_settimana, n_settimane)
+
+        if cp_model is not None:
+            return self._pianifica_turni_cpsat(giorni, settimane)
+        return self._pianifica_turni_greedy(giorni, settimane)
+
+    def _turni_da_coprire(self, data: datetime) -> List[int]:
+        """Indici dei turni da coprire in una data (tutti se non configurati)"""
+        richiesti = self.turni_richiesti_per_giorno.get(data.weekday(), [])
+        if not richiesti:
+            return list(range(len(self.turni)))
+        return [j for j, turno in enumerate(self.turni) if turno.nome in richiesti]
 
+    def _pianifica_turni_cpsat(self, giorni: List[datetime], settimane_giorni: List[int]) -> bool:
+        """
+        Pianificazione con solver CP-SAT.
+
+        Modello: variabile booleana x[i, d, j] = l'addetto i lavora il turno j
+        nel giorno d. Le variabili vengono create solo per i giorni in cui
+        l'addetto può lavorare (riposi e ferie sono quindi vincoli impliciti).
+        Vincoli: al più un turno per addetto al giorno, al più un addetto per
+        turno richiesto, massimo settimanale rigido; il minimo contrattuale è
+        un vincolo soft penalizzato nell'obiettivo insieme alla copertura.
+        """
+        model = cp_model.CpModel()
+
+        # CP-SAT richiede coefficienti interi: le durate sono già in minuti
+        minuti_turno = [turno.ore_minuti for turno in self.turni]
+        n_addetti = len(self.addetti)
+        copertura_giorni = [self._turni_da_coprire(data) for data in giorni]
+
+        x = {}
+        for i, addetto in enumerate(self.addetti):
+            for d, data in enumerate(giorni):
+                if not addetto.puo_lavorare(data):
+                    continue
+                for j in copertura_giorni[d]:
+                    x[i, d, j] = model.NewBoolVar(f"x_{i}_{d}_{j}")
+
+        # Al più un turno per addetto per giorno
+        for i in range(n_addetti):
+            for d in range(len(giorni)):
+                variabili = [x[i, d, j] for j in copertura_giorni[d] if (i, d, j) in x]
+                if variabili:
+                    model.AddAtMostOne(variabili)
+
+        # Al più un addetto per turno richiesto; la copertura viene premiata
+        # nell'obiettivo
+        copertura = []
+        for d in range(len(giorni)):
+            for j in copertura_giorni[d]:
+                variabili = [x[i, d, j] for i in range(n_addetti) if (i, d, j) in x]
+                if variabili:
+                    model.AddAtMostOne(variabili)
+                    copertura.extend(variabili)
+
+        # Rotazione: mai lo stesso turno due giorni di calendario consecutivi
+        # (clausola binaria per coppia di giorni adiacenti; con un solo turno
+        # il vincolo bloccherebbe ogni sequenza di lavoro e viene omesso)
+        if len(self.turni) > 1:
+            for d in range(len(giorni) - 1):
+                if (giorni[d + 1] - giorni[d]).days != 1:
+                    continue
+                for i in range(n_addetti):
+                    for j in copertura_giorni[d]:
+                        if (i, d, j) in x and (i, d + 1, j) in x:
+                            model.AddBoolOr([x[i, d, j].Not(), x[i, d + 1, j].Not()])
+
+        # Settimane ISO -> indici dei giorni
+        settimane: Dict[int, List[int]] = {}
+        for d, num_settimana in enumerate(settimane_giorni):
+            settimane.setdefault(num_settimana, []).append(d)
+
+        # Vincoli settimanali: massimo rigido, minimo contrattuale soft
+        deficit = []
+        for i, addetto in enumerate(self.addetti):
+            minuti_max = int(round(addetto.ore_max_settimanale * 60))
+            minuti_contratto = int(round(addetto.ore_contratto * 60))
+            for num_settimana, indici in settimane.items():
+                minuti_settimana = sum(
+                    minuti_turno[j] * x[i, d, j]
+                    for d in indici for j in copertura_giorni[d] if (i, d, j) in x
+                )
+                model.Add(minuti_settimana <= minuti_max)
+                slack = model.NewIntVar(0, minuti_contratto, f"deficit_{i}_{num_settimana}")
+                model.Add(minuti_settimana + slack >= minuti_contratto)
+                deficit.append(slack)
+
+        # Massimizza la copertura dei turni, poi minimizza i minuti mancanti
+        # rispetto al contratto (un'assegnazione vale più di qualunque deficit)
+        model.Maximize(10000 * sum(copertura) - sum(deficit))
+
+        # Warm start: l'euristica greedy produce in pochi ms una soluzione
+        # ammissibile che viene passata al solver come hint, così anche un
+        # budget di tempo corto parte già da un incumbent ragionevole
+        # (l'output del greedy viene scartato: gli avvisi definitivi sono
+        # quelli della soluzione CP-SAT)
+        indice_addetto = {addetto.nome: i for i, addetto in enumerate(self.addetti)}
+        indice_turno = {turno.nome: j for j, turno in enumerate(self.turni)}
+        with redirect_stdout(io.StringIO()):
+            self._pianifica_turni_greedy(giorni, settimane_giorni)
+        for d, data in enumerate(giorni):
+            for nome_addetto, turno in self.pianificazione[data].items():
+                chiave = (indice_addetto[nome_addetto], d, indice_turno[turno.nome])
+                if chiave in x:
+                    model.AddHint(x[chiave], 1)
+
+        # Azzera lo stato mutato dal greedy prima della risoluzione vera
+        prima_settimana = min(settimane_giorni)
+        n_settimane = max(settimane_giorni) - prima_settimana + 1
         self.pianificazione = {giorno: {} for giorno in giorni}
+        for addetto in self.addetti:
+            addetto.turni_assegnati = {}
+            addetto._init_settimane(prima_settimana, n_settimane)
+
+        solver = cp_model.CpSolver()
+        # Budget proporzionato al numero di variabili: un mese tipico si
+        # risolve in frazioni di secondo, il tetto resta per istanze dense
+        solver.parameters.max_time_in_seconds = min(10.0, 0.1 + len(x) / 1000)
+        # Con l'hint greedy una soluzione entro il 5% dal bound è sufficiente
+        solver.parameters.relative_gap_limit = 0.05
+        status = solver.Solve(model)
+
+        if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            # Modello non risolto (non dovrebbe accadere: i vincoli rigidi sono
+            # sempre soddisfacibili con zero assegnazioni): ripiega sul greedy
+            return self._pianifica_turni_greedy(giorni, settimane_giorni)
+
+        # Riporta la soluzione nelle strutture dell'applicazione
+        for (i, d, j), variabile in x.items():
+            if solver.Value(variabile):
+                addetto = self.addetti[i]
+                data = giorni[d]
+                turno = self.turni[j]
+                self.pianificazione[data][addetto.nome] = turno
+                addetto.turni_assegnati[data] = turno
+                addetto.add_ore_settimana(settimane_giorni[d], turno.ore_minuti)
+
+        # Stesso avviso del percorso greedy quando il minimo non è raggiungibile
+        for addetto in self.addetti:
+            minuti_totali = sum(addetto.ore_per_settimana.values())
+            if minuti_totali < addetto.ore_contratto * 60:
+                print(f"Attenzione: {addetto.nome} non può raggiungere {addetto.ore_contratto}h/settimana. "
+                      f"Assegnate solo {minuti_totali / 60}h")
 
-        # ===== FASE 1: Pianificazione Bilanciata =====
-        for data in giorni:
-            num_settimana = self.get_numero_settimana(data)
-            giorno_settimana = data.weekday()  # 0=lunedì, 6=domenica
+        return True
+
+    def _pianifica_turni_greedy(self, giorni: List[datetime], settimane_giorni: List[int]) -> bool:
+        """
+        Euristica greedy di pianificazione (fallback senza OR-Tools).
 
-            # Filtra addetti disponibili per questo giorno
-            disponibili = [a for a in self.addetti if a.puo_lavorare(data)]
+        Fase 1: Pianificazione Bilanciata - assegna i turni richiesti agli addetti con meno ore nella settimana
+        Fase 2: Verifica ore minime - assicura che ogni addetto raggiunga ore_contratto minime
+        """
+        # I turni da coprire dipendono solo dal giorno della settimana: le
+        # liste filtrate vengono costruite una volta per i 7 weekday invece
+        # che rifiltrate (con rimozioni O(n)) a ogni giorno del mese
+        turni_per_weekday = []
+        for weekday in range(7):
+            richiesti = self.turni_richiesti_per_giorno.get(weekday, [])
+            if not richiesti:
+                turni_per_weekday.append(self.turni)
+            else:
+                turni_per_weekday.append([t for t in self.turni if t.nome in richiesti])
 
+        # Disponibilità per giorno calcolata in blocco prima del loop: i giorni
+        # senza addetti disponibili vengono saltati senza altre allocazioni
+        disponibili_giorni = [[a for a in self.addetti if a.puo_lavorare(data)]
+                              for data in giorni]
+
+        # ===== FASE 1: Pianificazione Bilanciata =====
+        for data, num_settimana, disponibili in zip(giorni, settimane_giorni,
+                                                    disponibili_giorni):
             if not disponibili:
                 continue
 
-            # Ottieni i turni richiesti per questo giorno della settimana
-            turni_richiesti_nomi = self.turni_richiesti_per_giorno.get(giorno_settimana, [])
+            giorno_settimana = data.weekday()  # 0=lunedì, 6=domenica
+
+            # Liste parallele (layout SoA): ore già accumulate nella settimana
+            # e massimo settimanale, lette una sola volta per giorno invece che
+            # una volta per coppia turno×addetto. Gli addetti che ricevono un
+            # turno nel frattempo vengono comunque esclusi dal controllo su
+            # turni_assegnati, quindi lo snapshot resta corretto.
+            minuti_disponibili = [a.get_ore_settimana(num_settimana) for a in disponibili]
+            minuti_max_disponibili = [a.ore_max_settimanale * 60 for a in disponibili]
 
-            # Se non ci sono turni richiesti configurati, usa tutti i turni disponibili
-            if not turni_richiesti_nomi:
-                turni_da_assegnare = self.turni
-            else:
-                # Filtra solo i turni richiesti
-                turni_da_assegnare = [t for t in self.turni if t.nome in turni_richiesti_nomi]
+            # Turni richiesti per questo giorno della settimana (precalcolati)
+            turni_da_assegnare = turni_per_weekday[giorno_settimana]
 
             # Itera sui turni da assegnare
             for turno in turni_da_assegnare:
                 # Trova l'addetto disponibile migliore per questo turno
                 # Predilige addetti con meno ore nella settimana
                 migliore_addetto = None
+                minuti_migliore = None
+                minuti_turno = turno.ore_minuti
 
-                for addetto in disponibili:
+                for addetto, minuti_addetto, minuti_max in zip(disponibili, minuti_disponibili,
+                                                               minuti_max_disponibili):
                     # Controlla che l'addetto non abbia già un turno questo giorno
                     if data in addetto.turni_assegnati:
                         continue
 
                     # Controlla che possa aggiungere le ore senza superare il massimo settimanale
-                    if not addetto.puo_aggiungere_ore_settimana(num_settimana, turno.ore):
+                    if minuti_addetto + minuti_turno > minuti_max:
                         continue
 
                     # Se è il primo candidato valido, o ha meno ore della settimana
-                    if migliore_addetto is None:
+                    if migliore_addetto is None or minuti_addetto < minuti_migliore:
                         migliore_addetto = addetto
-                    else:
-                        ore_migliore = migliore_addetto.get_ore_settimana(num_settimana)
-                        ore_candidato = addetto.get_ore_settimana(num_settimana)
-                        if ore_candidato < ore_migliore:
-                            migliore_addetto = addetto
+                        minuti_migliore = minuti_addetto
 
                 # Assegna il turno al migliore addetto trovato
                 if migliore_addetto:
                     self.pianificazione[data][migliore_addetto.nome] = turno
                     migliore_addetto.turni_assegnati[data] = turno
-                    migliore_addetto.add_ore_settimana(num_settimana, turno.ore)
+                    migliore_addetto.add_ore_settimana(num_settimana, turno.ore_minuti)
 
         # ===== FASE 2: Verifica e Correzione Ore Minime =====
-        # Calcola ore totali per addetto per garantire minimo contrattato
+        # Calcola minuti totali per addetto per garantire minimo contrattato
         for addetto in self.addetti:
-            ore_totali = sum(addetto.ore_per_settimana.values())
+            minuti_totali = sum(addetto.ore_per_settimana.values())
+            minuti_contratto = addetto.ore_contratto * 60
 
             # Se ha meno ore del minimo contrattato, assegnagli altri turni
-            if ore_totali < addetto.ore_contratto:
-                ore_necessarie = addetto.ore_contratto - ore_totali
+            if minuti_totali < minuti_contratto:
+                minuti_necessari = minuti_contratto - minuti_totali
 
                 # Trova giorni disponibili dove aggiungere turni
-                for data in giorni:
-                    if ore_necessarie <= 0:
+                for data, num_settimana in zip(giorni, settimane_giorni):
+                    if minuti_necessari <= 0:
                         break
 
                     # Se l'addetto può già lavorare questo giorno e non ha turni
                     if addetto.puo_lavorare(data) and data not in addetto.turni_assegnati:
-                        num_settimana = self.get_numero_settimana(data)
-
                         # Trova un turno che può fare senza superare il massimo
                         for turno in self.turni:
-                            if addetto.puo_aggiungere_ore_settimana(num_settimana, turno.ore):
+                            if addetto.puo_aggiungere_ore_settimana(num_settimana, turno.ore_minuti):
                                 # Assegna il turno
                                 self.pianificazione[data][addetto.nome] = turno
                                 addetto.turni_assegnati[data] = turno
-                                addetto.add_ore_settimana(num_settimana, turno.ore)
-                                ore_necessarie -= turno.ore
+                                addetto.add_ore_settimana(num_settimana, turno.ore_minuti)
+                                minuti_necessari -= turno.ore_minuti
                                 break
 
                 # Avvisa se non è stato possibile raggiungere il minimo
-                if ore_necessarie > 0:
+                if minuti_necessari > 0:
                     print(f"Attenzione: {addetto.nome} non può raggiungere {addetto.ore_contratto}h/settimana. "
-                          f"Assegnate solo {ore_totali + (addetto.ore_contratto - ore_totali - ore_necessarie)}h")
+                          f"Assegnate solo {(minuti_contratto - minuti_necessari) / 60}h")
 
         return True
 
-    def _get_priorita_turno(self, addetto: Addetto, data: datetime) -> int:
-        """
-        Calcola la priorità del turno per evitare turni uguali consecutivi.
-        Restituisce 0 se il turno è diverso da quello della giorno precedente.
-        """
-        data_precedente = data - timedelta(days=1)
-
-        if data_precedente not in addetto.turni_assegnati:
-            return 0
-
-        ultimo_turno = addetto.turni_assegnati[data_precedente]
-
-        # Se ha turni assegnati e l'ultimo è diverso da quelli disponibili, ritorna 0
-        for turno in self.turni:
-            if turno != ultimo_turno:
-                return 0
-
-        return 1
-
-    def _seleziona_turni(self, addetti: List[Addetto]) -> List[Turno]:
-        """
-        Seleziona i turni da assegnare agli addetti disponibili.
-        Tenta di diversificare evitando ripetizioni.
-        """
-        turni_disponibili = self.turni.copy()
-        turni_selezionati = []
-
-        for addetto in addetti:
-            if turni_disponibili:
-                # Preferisce turni diversi da quelli recenti dell'addetto
-                turno = self._scegli_turno_migliore(addetto, turni_disponibili)
-                turni_selezionati.append(turno)
-                turni_disponibili.remove(turno)
-            else:
-                # Se finiscono i turni, ricomincia da capo
-                turni_disponibili = self.turni.copy()
-                if turni_disponibili:
-                    turno = turni_disponibili.pop(0)
-                    turni_selezionati.append(turno)
-
-        return turni_selezionati
-
-    def _scegli_turno_migliore(self, addetto: Addetto, turni: List[Turno]) -> Turno:
-        """
-        Sceglie il turno migliore per un addetto tra quelli disponibili.
-        Preferisce turni diversi dall'ultimo assegnato.
-        """
-        if not turni:
-            return self.turni[0]
-
-        # Se non ha ultimi turni, sceglie il primo disponibile
-        if not addetto.turni_assegnati:
-            return turni[0]
-
-        # Prende l'ultimo turno assegnato
-        ultimi_turni = list(addetto.turni_assegnati.values())
-        if ultimi_turni:
-            ultimo_turno = ultimi_turni[-1]
-
-            # Preferisce un turno diverso dall'ultimo
-            for turno in turni:
-                if turno != ultimo_turno:
-                    return turno
-
-        return turni[0]
-
     def genera_statistiche(self) -> Dict:
         """Genera statistiche sulla pianificazione"""
         stats = {
@@ -497,22 +775,29 @@ class TurnoManager:
             'dettaglio_domeniche': {}
         }
 
-        for addetto in self.addetti:
-            # Calcola ore totali sommando le ore per settimana
-            ore_totali = sum(addetto.ore_per_settimana.values())
-            stats['ore_totali_per_addetto'][addetto.nome] = ore_totali
-            stats['ore_per_settimana'][addetto.nome] = addetto.ore_per_settimana.copy()
+        # Addetti in ordine alfabetico: i dict per-addetto escono già ordinati
+        # per nome e le viste non devono riordinarli a ogni sezione
+        for addetto in sorted(self.addetti, key=lambda a: a.nome):
+            # Somma direttamente l'array interno dei minuti, senza passare
+            # dalla vista dict ore_per_settimana (le statistiche restano in ore)
+            minuti_totali = sum(addetto._ore_week)
+            stats['ore_totali_per_addetto'][addetto.nome] = minuti_totali / 60
+            stats['ore_per_settimana'][addetto.nome] = {
+                addetto._first_week + indice: minuti / 60
+                for indice, minuti in enumerate(addetto._ore_week) if minuti
+            }
             stats['giorni_lavorati_per_addetto'][addetto.nome] = len(addetto.turni_assegnati)
 
         # Conta domeniche lavorate
+        dettaglio_domeniche = stats['dettaglio_domeniche']
         for data, assegnazioni in self.pianificazione.items():
-            if assegnazioni:  # Se ci sono assegnazioni quel giorno
-                if self.is_domenica(data):
-                    stats['domeniche_lavorate'] += len(assegnazioni)
-                    for nome_addetto in assegnazioni.keys():
-                        if nome_addetto not in stats['dettaglio_domeniche']:
-                            stats['dettaglio_domeniche'][nome_addetto] = 0
-                        stats['dettaglio_domeniche'][nome_addetto] += 1
+            if assegnazioni and data.weekday() == 6:
+                stats['domeniche_lavorate'] += len(assegnazioni)
+                for nome_addetto in assegnazioni:
+                    dettaglio_domeniche[nome_addetto] = dettaglio_domeniche.get(nome_addetto, 0) + 1
+
+        # Anche il dettaglio domeniche esce ordinato per nome
+        stats['dettaglio_domeniche'] = dict(sorted(dettaglio_domeniche.items()))
 
         return stats
 
@@ -529,157 +814,124 @@ class TurnoManager:
         if nome_file is None:
             nome_file = f"turni_{self.mese:02d}_{self.anno}.xlsx"
 
-        # Crea workbook
-        wb = Workbook()
+        # Workbook in modalità write-only: le righe vengono serializzate in
+        # streaming senza tenere in memoria un oggetto Cell per ogni cella
+        wb = Workbook(write_only=True)
 
         # --- FOGLIO 1: Pianificazione (MATRICE: Giorni × Addetti) ---
-        ws_pianificazione = wb.active
-        ws_pianificazione.title = "Pianificazione"
+        ws_pianificazione = wb.create_sheet("Pianificazione")
 
-        # Titolo
-        giorni = self.get_giorni_mese()
-        ws_pianificazione['A1'] = f"PIANIFICAZIONE TURNI - {self._nome_mese()} {self.anno}"
-        ws_pianificazione['A1'].font = Font(bold=True, size=14)
         num_col_addetti = len(self.addetti)
+
+        # Larghezze colonne e celle unite vanno dichiarate prima degli append
+        ws_pianificazione.column_dimensions['A'].width = 20
+        for col_idx in range(num_col_addetti):
+            ws_pianificazione.column_dimensions[chr(66 + col_idx)].width = 20
         if num_col_addetti > 0:
             last_col = chr(65 + num_col_addetti)  # Colonna dopo l'ultimo addetto
-            ws_pianificazione.merge_cells(f'A1:{last_col}1')
+            ws_pianificazione.merged_cells.ranges.add(f'A1:{last_col}1')
+
+        # Titolo
+        titolo = f"PIANIFICAZIONE TURNI - {self._nome_mese()} {self.anno}"
+        ws_pianificazione.append([_cella_stile(ws_pianificazione, titolo, font=_FONT_TITOLO)])
+        ws_pianificazione.append([])
 
         # Intestazioni colonne: Data/Giorno + nomi addetti
-        ws_pianificazione['A3'] = "Data / Giorno"
-        ws_pianificazione['A3'].font = Font(bold=True, color="FFFFFF")
-        ws_pianificazione['A3'].fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-
-        for col_idx, addetto in enumerate(self.addetti):
-            col_letter = chr(66 + col_idx)  # B, C, D, ...
-            ws_pianificazione[f'{col_letter}3'] = addetto.nome
-            ws_pianificazione[f'{col_letter}3'].font = Font(bold=True, color="FFFFFF")
-            ws_pianificazione[f'{col_letter}3'].fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-            ws_pianificazione.column_dimensions[col_letter].width = 20
-
-        # Dati: una riga per ogni giorno
-        row = 4
-        for data in giorni:
+        ws_pianificazione.append([
+            _cella_stile(ws_pianificazione, testo, font=_FONT_HEADER, fill=_FILL_HEADER)
+            for testo in ["Data / Giorno"] + [addetto.nome for addetto in self.addetti]
+        ])
+
+        # Etichette dei turni formattate una volta per export invece che una
+        # volta per cella (lo stesso turno compare in molte celle)
+        etichette_turno = {turno.nome: f"{turno.nome}\n({turno.ora_inizio}-{turno.ora_fine})"
+                           for turno in self.turni}
+        pianificazione_get = self.pianificazione.get
+
+        # Dati: una riga per ogni giorno, appesa intera con gli stili già
+        # applicati; il generatore evita di materializzare la lista dei giorni
+        for data in self.iter_giorni_mese():
             # Colora festivi e domeniche
             if self.is_festivo(data):
-                colore = "FFCCCC"  # Rosso chiaro
+                fill = _FILL_FESTIVO
             elif self.is_domenica(data):
-                colore = "FFFFCC"  # Giallo chiaro
+                fill = _FILL_DOMENICA
             else:
-                colore = "FFFFFF"  # Bianco
-
-            # Data e giorno
-            data_str = f"{data.strftime('%d/%m')} ({self._nome_giorno_italiano(data.weekday())})"
-            ws_pianificazione[f'A{row}'] = data_str
-            ws_pianificazione[f'A{row}'].fill = PatternFill(start_color=colore, end_color=colore, fill_type="solid")
-
-            # Turni assegnati agli addetti per questo giorno
-            assegnazioni = self.pianificazione.get(data, {})
-            for col_idx, addetto in enumerate(self.addetti):
-                col_letter = chr(66 + col_idx)
+                fill = _FILL_NEUTRO
 
+            data_str = f"{data.strftime('%d/%m')} ({_NOMI_GIORNO[data.weekday()]})"
+            assegnazioni = pianificazione_get(data, {})
+            riga = [_cella_stile(ws_pianificazione, data_str, fill=fill)]
+            for addetto in self.addetti:
                 if addetto.nome in assegnazioni:
-                    turno = assegnazioni[addetto.nome]
-                    turno_str = f"{turno.nome}\n({turno.ora_inizio}-{turno.ora_fine})"
+                    turno_str = etichette_turno[assegnazioni[addetto.nome].nome]
                 else:
                     turno_str = "-"
+                riga.append(_cella_stile(ws_pianificazione, turno_str,
+                                         fill=fill, alignment=_ALIGN_WRAP))
 
-                ws_pianificazione[f'{col_letter}{row}'] = turno_str
-                ws_pianificazione[f'{col_letter}{row}'].fill = PatternFill(start_color=colore, end_color=colore, fill_type="solid")
-                ws_pianificazione[f'{col_letter}{row}'].alignment = Alignment(wrap_text=True, vertical="center")
-
-            row += 1
-
-        # Autofit colonna A
-        ws_pianificazione.column_dimensions['A'].width = 20
+            ws_pianificazione.append(riga)
 
         # --- FOGLIO 2: Statistiche ---
         ws_stats = wb.create_sheet("Statistiche")
 
         stats = self.genera_statistiche()
 
-        ws_stats['A1'] = "STATISTICHE PIANIFICAZIONE"
-        ws_stats['A1'].font = Font(bold=True, size=14)
+        ws_stats.column_dimensions['A'].width = 20
+        ws_stats.column_dimensions['B'].width = 15
+        ws_stats.column_dimensions['D'].width = 20
+        ws_stats.column_dimensions['E'].width = 15
 
-        # Ore totali per addetto
-        ws_stats['A3'] = "ORE TOTALI PER ADDETTO"
-        ws_stats['A3'].font = Font(bold=True)
-        ws_stats['A4'] = "Addetto"
-        ws_stats['B4'] = "Ore"
+        ws_stats.append([_cella_stile(ws_stats, "STATISTICHE PIANIFICAZIONE", font=_FONT_TITOLO)])
+        ws_stats.append([])
 
-        row = 5
-        for nome, ore in stats['ore_totali_per_addetto'].items():
-            ws_stats[f'A{row}'] = nome
-            ws_stats[f'B{row}'] = ore
-            row += 1
-
-        # Giorni lavorati
-        ws_stats['D3'] = "GIORNI LAVORATI"
-        ws_stats['D3'].font = Font(bold=True)
-        ws_stats['D4'] = "Addetto"
-        ws_stats['E4'] = "Giorni"
+        # Ore totali e giorni lavorati, blocchi affiancati (colonne A-B e D-E)
+        ws_stats.append([_cella_stile(ws_stats, "ORE TOTALI PER ADDETTO", font=_FONT_BOLD), None,
+                         None, _cella_stile(ws_stats, "GIORNI LAVORATI", font=_FONT_BOLD)])
+        ws_stats.append(["Addetto", "Ore", None, "Addetto", "Giorni"])
 
         row = 5
-        for nome, giorni_lav in stats['giorni_lavorati_per_addetto'].items():
-            ws_stats[f'D{row}'] = nome
-            ws_stats[f'E{row}'] = giorni_lav
+        for nome, ore in stats['ore_totali_per_addetto'].items():
+            ws_stats.append([nome, ore, None,
+                             nome, stats['giorni_lavorati_per_addetto'][nome]])
             row += 1
 
-        # Domeniche lavorate
-        ws_stats['A13'] = "DOMENICHE LAVORATE"
-        ws_stats['A13'].font = Font(bold=True)
-        ws_stats['A14'] = "Addetto"
-        ws_stats['B14'] = "Giorni"
-
-        row = 15
-        for nome, giorni in stats['dettaglio_domeniche'].items():
-            ws_stats[f'A{row}'] = nome
-            ws_stats[f'B{row}'] = giorni
+        # Domeniche lavorate (da riga 13, come nel layout storico)
+        while row < 13:
+            ws_stats.append([])
             row += 1
+        ws_stats.append([_cella_stile(ws_stats, "DOMENICHE LAVORATE", font=_FONT_BOLD)])
+        ws_stats.append(["Addetto", "Giorni"])
 
-        ws_stats.column_dimensions['A'].width = 20
-        ws_stats.column_dimensions['B'].width = 15
-        ws_stats.column_dimensions['D'].width = 20
-        ws_stats.column_dimensions['E'].width = 15
+        for nome, giorni_dom in stats['dettaglio_domeniche'].items():
+            ws_stats.append([nome, giorni_dom])
 
         # --- FOGLIO 3: Dettagli Addetti ---
         ws_addetti = wb.create_sheet("Dettagli Addetti")
 
-        ws_addetti['A1'] = "DETTAGLI ADDETTI E VINCOLI"
-        ws_addetti['A1'].font = Font(bold=True, size=14)
+        for col, larghezza in (('A', 20), ('B', 15), ('C', 12),
+                               ('D', 15), ('E', 20), ('F', 20)):
+            ws_addetti.column_dimensions[col].width = larghezza
 
-        ws_addetti['A3'] = "Nome"
-        ws_addetti['B3'] = "Ore Contratto (min)"
-        ws_addetti['C3'] = "Ore Max (sett)"
-        ws_addetti['D3'] = "Straordinario"
-        ws_addetti['E3'] = "Giorni Riposo"
-        ws_addetti['F3'] = "Giorni Ferie"
+        ws_addetti.append([_cella_stile(ws_addetti, "DETTAGLI ADDETTI E VINCOLI", font=_FONT_TITOLO)])
+        ws_addetti.append([])
+        ws_addetti.append([
+            _cella_stile(ws_addetti, testo, font=_FONT_HEADER, fill=_FILL_HEADER)
+            for testo in ["Nome", "Ore Contratto (min)", "Ore Max (sett)",
+                          "Straordinario", "Giorni Riposo", "Giorni Ferie"]
+        ])
 
-        for col in ['A', 'B', 'C', 'D', 'E', 'F']:
-            ws_addetti[f'{col}3'].font = Font(bold=True, color="FFFFFF")
-            ws_addetti[f'{col}3'].fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-
-        row = 4
         for addetto in self.addetti:
-            ws_addetti[f'A{row}'] = addetto.nome
-            ws_addetti[f'B{row}'] = addetto.ore_contratto
-            ws_addetti[f'C{row}'] = addetto.ore_max_settimanale
-            ws_addetti[f'D{row}'] = "Sì" if addetto.straordinario else "No"
-
-            giorni_riposo = [self._nome_giorno_italiano(g) for g in sorted(addetto.giorni_riposo)]
-            ws_addetti[f'E{row}'] = ", ".join(giorni_riposo) if giorni_riposo else "-"
-
-            ferie = [f.strftime("%d/%m") for f in sorted(addetto.ferie_permessi)]
-            ws_addetti[f'F{row}'] = ", ".join(ferie) if ferie else "-"
-
-            row += 1
-
-        ws_addetti.column_dimensions['A'].width = 20
-        ws_addetti.column_dimensions['B'].width = 15
-        ws_addetti.column_dimensions['C'].width = 12
-        ws_addetti.column_dimensions['D'].width = 15
-        ws_addetti.column_dimensions['E'].width = 20
-        ws_addetti.column_dimensions['F'].width = 20
+            giorni_riposo = [self._nome_giorno_italiano(g) for g in addetto.giorni_riposo_sorted]
+            ferie = [f.strftime("%d/%m") for f in addetto.ferie_date]
+            ws_addetti.append([
+                addetto.nome,
+                addetto.ore_contratto,
+                addetto.ore_max_settimanale,
+                "Sì" if addetto.straordinario else "No",
+                ", ".join(giorni_riposo) if giorni_riposo else "-",
+                ", ".join(ferie) if ferie else "-",
+            ])
 
         # Salva workbook
         wb.save(nome_file)
@@ -688,16 +940,11 @@ class TurnoManager:
 
     def _nome_mese(self) -> str:
         """Restituisce il nome del mese in italiano"""
-        nomi = [
-            "Gennaio", "Febbraio", "Marzo", "Aprile", "Maggio", "Giugno",
-            "Luglio", "Agosto", "Settembre", "Ottobre", "Novembre", "Dicembre"
-        ]
-        return nomi[self.mese - 1]
+        return _NOMI_MESE[self.mese - 1]
 
     def _nome_giorno_italiano(self, weekday: int) -> str:
         """Converte il numero del giorno della settimana in nome italiano"""
-        nomi = ["Lunedì", "Martedì", "Mercoledì", "Giovedì", "Venerdì", "Sabato", "Domenica"]
-        return nomi[weekday]
+        return _NOMI_GIORNO[weekday]
 
 
 class MenuInterattivo:
@@ -915,15 +1162,14 @@ class MenuInterattivo:
                 print("Nessuna feria registrata.")
                 return
 
-            ferie_str = [f.strftime("%d/%m/%Y") for f in addetto.ferie_permessi]
-            for i, feria in enumerate(ferie_str, 1):
-                print(f"{i}. {feria}")
+            ferie = addetto.ferie_date
+            for i, feria in enumerate(ferie, 1):
+                print(f"{i}. {feria.strftime('%d/%m/%Y')}")
 
             try:
                 scelta_feria = int(input("Seleziona numero feria da rimuovere: ")) - 1
-                if 0 <= scelta_feria < len(addetto.ferie_permessi):
-                    feria = addetto.ferie_permessi[scelta_feria]
-                    addetto.rimuovi_ferie(feria)
+                if 0 <= scelta_feria < len(ferie):
+                    addetto.rimuovi_ferie(ferie[scelta_feria])
                     print("✓ Feria rimossa")
             except ValueError:
                 print("Numero non valido")
@@ -988,7 +1234,7 @@ class MenuInterattivo:
 
         nome = input("Nome turno (es. Mattina, Pomeriggio): ").strip()
 
-        if any(t.nome.lower() == nome.lower() for t in self.manager.turni):
+        if nome.lower() in self.manager.nomi_turni_lower():
             print("Turno già esistente!")
             return
 
@@ -996,10 +1242,9 @@ class MenuInterattivo:
         ora_fine = input("Ora fine (HH:MM): ").strip()
 
         try:
-            # Valida formato HH:MM
-            datetime.strptime(ora_inizio, "%H:%M")
-            datetime.strptime(ora_fine, "%H:%M")
-
+            # Il formato HH:MM viene validato dal costruttore di Turno con un
+            # parser manuale: niente strptime, che ad ogni chiamata ripassa
+            # dalla macchina delle locale ed è ordini di grandezza più lento
             turno = Turno(nome, ora_inizio, ora_fine)
             self.manager.aggiungi_turno(turno)
             print(f"\n✓ Turno '{nome}' aggiunto ({turno.ore}h)")
@@ -1028,7 +1273,7 @@ class MenuInterattivo:
 
         nome = input("\nNome turno da rimuovere: ").strip()
 
-        if not any(t.nome.lower() == nome.lower() for t in self.manager.turni):
+        if nome.lower() not in self.manager.nomi_turni_lower():
             print("Turno non trovato.")
             return
 
@@ -1075,29 +1320,36 @@ class MenuInterattivo:
             print("\nNessuna pianificazione disponibile. Esegui prima la pianificazione.")
             return
 
-        print("\n" + "="*60)
-        print(f"   PIANIFICAZIONE {self.manager._nome_mese()} {self.manager.anno}".center(60))
-        print("="*60 + "\n")
-
-        giorni = self.manager.get_giorni_mese()
+        # Accumula le righe e scrive in un colpo solo: una write invece di
+        # una print (lock + flush) per ogni giorno del mese
+        righe = [
+            "",
+            _SEP,
+            f"   PIANIFICAZIONE {self.manager._nome_mese()} {self.manager.anno}".center(60),
+            _SEP,
+            "",
+        ]
 
-        # Stampa in formato tabella semplificato
-        for data in giorni:
+        # Formato tabella semplificato; la classificazione festivo/domenica
+        # arriva precalcolata dal manager invece di due chiamate per giorno
+        classifica = self.manager.classifica_giorni()
+        for data in self.manager.get_giorni_mese():
             assegnazioni = self.manager.pianificazione.get(data, {})
             giorno_settimana = self.manager._nome_giorno_italiano(data.weekday())
-            data_str = data.strftime("%d/%m")
+            # f-string diretta invece di strftime: niente parsing del formato
+            data_str = f"{data.day:02d}/{data.month:02d}"
 
-            tipo = ""
-            if self.manager.is_festivo(data):
-                tipo = "[FESTIVO]"
-            elif self.manager.is_domenica(data):
-                tipo = "[DOMENICA]"
+            tipo = classifica.get(data, "")
 
             if assegnazioni:
-                addetti_str = ", ".join([f"{nome} ({turno.nome})" for nome, turno in assegnazioni.items()])
-                print(f"{data_str} {giorno_settimana:12} {tipo:12} → {addetti_str}")
+                # Generatore: join copia una volta sola, senza lista intermedia
+                addetti_str = ", ".join(f"{nome} ({turno.nome})"
+                                        for nome, turno in assegnazioni.items())
+                righe.append(f"{data_str} {giorno_settimana:12} {tipo:12} → {addetti_str}")
             else:
-                print(f"{data_str} {giorno_settimana:12} {tipo:12} → Nessun turno")
+                righe.append(f"{data_str} {giorno_settimana:12} {tipo:12} → Nessun turno")
+
+        sys.stdout.write("\n".join(righe) + "\n")
 
     def mostra_statistiche(self):
         """Visualizza le statistiche della pianificazione"""
@@ -1107,36 +1359,43 @@ class MenuInterattivo:
 
         stats = self.manager.genera_statistiche()
 
-        print("\n" + "="*60)
-        print("   STATISTICHE PIANIFICAZIONE".center(60))
-        print("="*60)
+        # Come per la pianificazione: righe accumulate e scritte in blocco
+        righe = ["", _SEP, "   STATISTICHE PIANIFICAZIONE".center(60), _SEP]
 
-        print("\n--- ORE TOTALI PER ADDETTO (mese) ---")
-        for nome, ore in sorted(stats['ore_totali_per_addetto'].items()):
-            print(f"{nome:20} {ore:5.0f}h totali nel mese")
+        # I dict delle statistiche arrivano già ordinati per nome
+        righe.append("\n--- ORE TOTALI PER ADDETTO (mese) ---")
+        for nome, ore in stats['ore_totali_per_addetto'].items():
+            righe.append(f"{nome:20} {ore:5.0f}h totali nel mese")
+
+        # Indice per nome già mantenuto dal manager: niente scansione lineare
+        # degli addetti per ogni riga della sezione settimanale
+        addetti_by_name = self.manager._addetti_by_name
 
-        print("\n--- ORE PER SETTIMANA ---")
-        for nome, ore_settimane in sorted(stats['ore_per_settimana'].items()):
-            addetto = next(a for a in self.manager.addetti if a.nome == nome)
+        righe.append("\n--- ORE PER SETTIMANA ---")
+        for nome, ore_settimane in stats['ore_per_settimana'].items():
+            addetto = addetti_by_name[nome]
             if ore_settimane:
-                dettagli = ", ".join([f"Sett {s}: {o:.0f}h" for s, o in sorted(ore_settimane.items())])
-                print(f"{nome:20} {dettagli}")
+                # Le settimane sono già in ordine crescente (array per offset)
+                dettagli = ", ".join([f"Sett {s}: {o:.0f}h" for s, o in ore_settimane.items()])
+                righe.append(f"{nome:20} {dettagli}")
                 media = sum(ore_settimane.values()) / len(ore_settimane)
-                print(f"{'':20} Media settimanale: {media:.1f}h (contratto: {addetto.ore_contratto}h min, max {addetto.ore_max_settimanale}h)")
+                righe.append(f"{'':20} Media settimanale: {media:.1f}h (contratto: {addetto.ore_contratto}h min, max {addetto.ore_max_settimanale}h)")
 
-        print("\n--- GIORNI LAVORATI PER ADDETTO ---")
-        for nome, giorni in sorted(stats['giorni_lavorati_per_addetto'].items()):
-            print(f"{nome:20} {giorni:3} giorni")
+        righe.append("\n--- GIORNI LAVORATI PER ADDETTO ---")
+        for nome, giorni in stats['giorni_lavorati_per_addetto'].items():
+            righe.append(f"{nome:20} {giorni:3} giorni")
 
         if stats['dettaglio_domeniche']:
-            print("\n--- DOMENICHE LAVORATE ---")
-            for nome, giorni in sorted(stats['dettaglio_domeniche'].items()):
-                print(f"{nome:20} {giorni:3} domeniche")
+            righe.append("\n--- DOMENICHE LAVORATE ---")
+            for nome, giorni in stats['dettaglio_domeniche'].items():
+                righe.append(f"{nome:20} {giorni:3} domeniche")
 
-        print("\n--- RIEPILOGO ---")
-        print(f"Mese: {self.manager._nome_mese()} {self.manager.anno}")
-        print(f"Giorni lavorativi: {len(self.manager.get_giorni_mese())}")
-        print(f"Addetti totali: {len(self.manager.addetti)}")
+        righe.append("\n--- RIEPILOGO ---")
+        righe.append(f"Mese: {self.manager._nome_mese()} {self.manager.anno}")
+        righe.append(f"Giorni lavorativi: {len(self.manager.get_giorni_mese())}")
+        righe.append(f"Addetti totali: {len(self.manager.addetti)}")
+
+        sys.stdout.write("\n".join(righe) + "\n")
 
     def esporta_excel(self):
         """Esporta la pianificazione in Excel"""
@@ -1164,16 +1423,22 @@ class MenuInterattivo:
         """Modifica il mese e l'anno di pianificazione"""
         print("\n--- Impostazioni Mese/Anno ---")
 
+        # Legge entrambi gli input prima di validare: lo stato del manager
+        # viene toccato solo a validazione completata, mai parzialmente
+        testo_mese = input(f"Mese (1-12, default {self.manager.mese}): ").strip()
+        testo_anno = input(f"Anno (default {self.manager.anno}): ").strip()
+
         try:
-            mese = int(input(f"Mese (1-12, default {self.manager.mese}): ") or self.manager.mese)
-            anno = int(input(f"Anno (default {self.manager.anno}): ") or self.manager.anno)
+            mese = int(testo_mese) if testo_mese else self.manager.mese
+            anno = int(testo_anno) if testo_anno else self.manager.anno
 
-            if 1 <= mese <= 12 and anno >= 2000:
-                self.manager.mese = mese
-                self.manager.anno = anno
-                print(f"✓ Data impostata: {self.manager._nome_mese()} {anno}")
-            else:
+            if not (1 <= mese <= 12 and anno >= 2000):
                 print("Valori non validi.")
+                return
+
+            self.manager.mese = mese
+            self.manager.anno = anno
+            print(f"✓ Data impostata: {self.manager._nome_mese()} {anno}")
         except ValueError:
             print("Inserisci numeri validi.")
 
@@ -5,20 +5,31 @@ GESTIONE TURNI NEGOZIO - INTERFACCIA GRAFICA PyQt6
 Interfaccia grafica per il programma di pianificazione turni
 """
 
+import copy
 import sys
 from datetime import datetime
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QPushButton, QLabel, QTableWidget, QTableWidgetItem, QDialog,
+    QPushButton, QLabel, QTableWidget, QTableWidgetItem, QTableView, QDialog,
     QLineEdit, QSpinBox, QCheckBox, QComboBox, QDateEdit,
     QMessageBox, QTabWidget, QDateTimeEdit, QListWidget, QListWidgetItem,
-    QHeaderView, QCalendarWidget, QScrollArea
+    QHeaderView, QCalendarWidget, QScrollArea, QPlainTextEdit
+)
+from PyQt6.QtCore import (
+    Qt, QDate, QDateTime, QTimer, QAbstractTableModel, QModelIndex,
+    QObject, QRunnable, QThreadPool, pyqtSignal
 )
-from PyQt6.QtCore import Qt, QDate, QDateTime
 from PyQt6.QtGui import QColor, QFont
 
 from gestione_turni import Addetto, Turno, TurnoManager
 
+# Colori di evidenziazione condivisi (i giorni normali non hanno sfondo)
+_COL_FESTIVO = QColor(255, 200, 200)
+_COL_DOMENICA = QColor(255, 255, 200)
+
+# Abbreviazioni dei giorni della settimana (indice = weekday)
+_GIORNI_ABBREV = ("Lun", "Mar", "Mer", "Gio", "Ven", "Sab", "Dom")
+
 
 def center_dialog_on_parent(dialog, parent):
     """Centra un dialog sulla finestra padre"""
@@ -263,6 +274,70 @@ class DialogConfiguraTurniRichiesti(QDialog):
             QMessageBox.critical(self, "Errore", "Errore durante il salvataggio")
 
 
+class _SegnaliExport(QObject):
+    """Segnali di fine export, emessi dal worker verso il thread GUI"""
+    completato = pyqtSignal(str)
+    errore = pyqtSignal(str)
+
+
+class ExportRunnable(QRunnable):
+    """Esegue l'export Excel su un thread del pool, fuori dal thread GUI.
+
+    Riceve uno snapshot del manager (vedi FinestraPrincipale.esporta_excel):
+    il worker non deve mai leggere strutture che il thread GUI può mutare."""
+
+    def __init__(self, manager):
+        super().__init__()
+        self.manager = manager
+        self.segnali = _SegnaliExport()
+
+    def run(self):
+        try:
+            percorso = self.manager.esporta_excel()
+            self.segnali.completato.emit(percorso)
+        except Exception as e:
+            self.segnali.errore.emit(str(e))
+
+
+class PianificazioneModel(QAbstractTableModel):
+    """Modello tabellare della pianificazione (una riga per assegnazione)"""
+
+    INTESTAZIONI = ("Data", "Giorno", "Addetto", "Turno (Orario)")
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # Ogni riga è una tupla (data, giorno, addetto, turno, colore)
+        self._righe = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._righe)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.INTESTAZIONI)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        riga = self._righe[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return riga[index.column()]
+        if role == Qt.ItemDataRole.BackgroundRole:
+            return riga[4]
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if (role == Qt.ItemDataRole.DisplayRole
+                and orientation == Qt.Orientation.Horizontal):
+            return self.INTESTAZIONI[section]
+        return super().headerData(section, orientation, role)
+
+    def imposta_righe(self, righe):
+        """Sostituisce tutte le righe con un unico reset del modello"""
+        self.beginResetModel()
+        self._righe = righe
+        self.endResetModel()
+
+
 class FinestraPrincipale(QMainWindow):
     """Finestra principale dell'applicazione"""
 
@@ -273,13 +348,15 @@ class FinestraPrincipale(QMainWindow):
         # Calcola dimensioni responsive in base allo schermo
         try:
             screen = QApplication.primaryScreen()
+            if screen is None:
+                raise RuntimeError("nessuno schermo disponibile")
             screen_geometry = screen.availableGeometry()
             width = int(screen_geometry.width() * 0.85)  # 85% della larghezza schermo
             height = int(screen_geometry.height() * 0.90)  # 90% dell'altezza schermo
             x = (screen_geometry.width() - width) // 2   # Centra orizzontalmente
             y = (screen_geometry.height() - height) // 2 # Centra verticalmente
             self.setGeometry(x, y, width, height)
-        except:
+        except (AttributeError, RuntimeError):
             # Fallback a dimensioni fisse se c'è errore
             self.setGeometry(50, 50, 1200, 800)
 
@@ -291,20 +368,29 @@ class FinestraPrincipale(QMainWindow):
         else:
             print("⚠ Nessun salvataggio precedente trovato")
 
+        # Debounce per il ricalcolo statistiche su scroll rapido di mese/anno
+        self._timer_statistiche = QTimer(self)
+        self._timer_statistiche.setSingleShot(True)
+        self._timer_statistiche.setInterval(200)
+        self._timer_statistiche.timeout.connect(self.aggiorna_statistiche)
+
         # Crea il widget centrale con tab
         self.tabs = QTabWidget()
         self.setCentralWidget(self.tabs)
 
-        # Crea i tab
+        # Crea subito i tab di partenza; pianificazione e statistiche sono
+        # segnaposto costruiti alla prima visita (o al primo refresh)
         self.tab_addetti = self.crea_tab_addetti()
         self.tab_turni = self.crea_tab_turni()
-        self.tab_pianificazione = self.crea_tab_pianificazione()
-        self.tab_statistiche = self.crea_tab_statistiche()
 
         self.tabs.addTab(self.tab_addetti, "Addetti")
         self.tabs.addTab(self.tab_turni, "Turni")
-        self.tabs.addTab(self.tab_pianificazione, "Pianificazione")
-        self.tabs.addTab(self.tab_statistiche, "Statistiche")
+        self.tabs.addTab(QWidget(), "Pianificazione")
+        self.tabs.addTab(QWidget(), "Statistiche")
+
+        self._tab_pigri = {2: self.crea_tab_pianificazione,
+                           3: self.crea_tab_statistiche}
+        self.tabs.currentChanged.connect(self._costruisci_tab)
 
         # Popola le tabelle con i dati caricati
         self.aggiorna_tabella_addetti()
@@ -320,7 +406,12 @@ class FinestraPrincipale(QMainWindow):
         ricerca_layout.addWidget(QLabel("Cerca:"))
         self.ricerca_addetti_input = QLineEdit()
         self.ricerca_addetti_input.setPlaceholderText("Digita nome addetto...")
-        self.ricerca_addetti_input.textChanged.connect(self.filtra_addetti)
+        # Debounce: il filtro parte solo 150ms dopo l'ultima battitura
+        self._timer_filtro_addetti = QTimer(self)
+        self._timer_filtro_addetti.setSingleShot(True)
+        self._timer_filtro_addetti.setInterval(150)
+        self._timer_filtro_addetti.timeout.connect(self.filtra_addetti)
+        self.ricerca_addetti_input.textChanged.connect(self._timer_filtro_addetti.start)
         ricerca_layout.addWidget(self.ricerca_addetti_input)
         layout.addLayout(ricerca_layout)
 
@@ -332,6 +423,10 @@ class FinestraPrincipale(QMainWindow):
             ["Nome", "Ore Contratto (min)", "Ore Max (sett)", "Straordinario", "Giorni Riposo"]
         )
         self.tabella_addetti.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        # Altezza righe fissa: evita la misurazione per-riga a ogni refresh
+        vh = self.tabella_addetti.verticalHeader()
+        vh.setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        vh.setDefaultSectionSize(22)
         layout.addWidget(self.tabella_addetti)
 
         # Bottoni
@@ -360,6 +455,10 @@ class FinestraPrincipale(QMainWindow):
             ["Nome", "Ora Inizio", "Ora Fine", "Ore"]
         )
         self.tabella_turni.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        # Altezza righe fissa: evita la misurazione per-riga a ogni refresh
+        vh = self.tabella_turni.verticalHeader()
+        vh.setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        vh.setDefaultSectionSize(22)
         layout.addWidget(self.tabella_turni)
 
         # Bottoni
@@ -414,22 +513,24 @@ class FinestraPrincipale(QMainWindow):
         layout = QVBoxLayout()
 
         layout.addWidget(QLabel("Pianificazione Turni:"))
-        self.tabella_pianificazione = QTableWidget()
-        self.tabella_pianificazione.setColumnCount(4)
-        self.tabella_pianificazione.setHorizontalHeaderLabels(
-            ["Data", "Giorno", "Addetto", "Turno (Orario)"]
-        )
+        self.modello_pianificazione = PianificazioneModel(self)
+        self.tabella_pianificazione = QTableView()
+        self.tabella_pianificazione.setModel(self.modello_pianificazione)
         self.tabella_pianificazione.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        # Altezza righe fissa: evita la misurazione per-riga a ogni refresh
+        vh = self.tabella_pianificazione.verticalHeader()
+        vh.setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        vh.setDefaultSectionSize(22)
         layout.addWidget(self.tabella_pianificazione)
 
         # Bottoni
         btn_layout = QHBoxLayout()
         btn_aggiorna = QPushButton("Aggiorna Visualizzazione")
-        btn_export = QPushButton("Esporta Excel")
+        self.btn_export_excel = QPushButton("Esporta Excel")
         btn_aggiorna.clicked.connect(self.aggiorna_pianificazione)
-        btn_export.clicked.connect(self.esporta_excel)
+        self.btn_export_excel.clicked.connect(self.esporta_excel)
         btn_layout.addWidget(btn_aggiorna)
-        btn_layout.addWidget(btn_export)
+        btn_layout.addWidget(self.btn_export_excel)
         layout.addLayout(btn_layout)
 
         widget.setLayout(layout)
@@ -440,16 +541,11 @@ class FinestraPrincipale(QMainWindow):
         widget = QWidget()
         layout = QVBoxLayout()
 
-        # Area statistiche
-        self.statistiche_text = QLabel()
+        # Area statistiche (QPlainTextEdit scorre da solo, niente wrapper)
+        self.statistiche_text = QPlainTextEdit()
+        self.statistiche_text.setReadOnly(True)
         self.statistiche_text.setFont(QFont("Courier", 10))
-        self.statistiche_text.setAlignment(Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignLeft)
-        scroll_area = QWidget()
-        scroll_layout = QVBoxLayout()
-        scroll_layout.addWidget(self.statistiche_text)
-        scroll_area.setLayout(scroll_layout)
-
-        layout.addWidget(scroll_area)
+        layout.addWidget(self.statistiche_text)
 
         # Bottone aggiorna
         btn_aggiorna = QPushButton("Aggiorna Statistiche")
@@ -459,13 +555,24 @@ class FinestraPrincipale(QMainWindow):
         widget.setLayout(layout)
         return widget
 
+    def _costruisci_tab(self, indice):
+        """Costruisce un tab pigro alla prima visita, se non già fatto"""
+        factory = self._tab_pigri.pop(indice, None)
+        if factory is None:
+            return
+        corrente = self.tabs.currentIndex()
+        titolo = self.tabs.tabText(indice)
+        self.tabs.removeTab(indice)
+        self.tabs.insertTab(indice, factory(), titolo)
+        self.tabs.setCurrentIndex(corrente)
+
     def aggiungi_addetto(self):
         """Apre il dialog per aggiungere un addetto"""
         dialog = DialogAggiungiAddetto(self)
         if dialog.exec() == QDialog.DialogCode.Accepted:
             if dialog.addetto:
                 # Controlla duplicati
-                if any(a.nome.lower() == dialog.addetto.nome.lower() for a in self.manager.addetti):
+                if dialog.addetto.nome.lower() in self.manager.nomi_addetti_lower():
                     QMessageBox.warning(self, "Errore", "Addetto già esistente!")
                     return
 
@@ -499,39 +606,55 @@ class FinestraPrincipale(QMainWindow):
         """Filtra la tabella degli addetti in base al testo cercato"""
         testo_ricerca = self.ricerca_addetti_input.text().lower()
 
-        for riga in range(self.tabella_addetti.rowCount()):
-            nome_addetto = self.tabella_addetti.item(riga, 0).text()
+        for riga, nome_lower in enumerate(self._nomi_addetti_lower):
             # Mostra la riga se il nome contiene il testo cercato, altrimenti la nasconde
-            self.tabella_addetti.setRowHidden(riga, testo_ricerca not in nome_addetto.lower())
+            self.tabella_addetti.setRowHidden(riga, testo_ricerca not in nome_lower)
 
     def aggiorna_tabella_addetti(self):
         """Aggiorna la tabella degli addetti"""
+        # Sospende repaint e segnali durante il riempimento massivo
+        self.tabella_addetti.setUpdatesEnabled(False)
+        self.tabella_addetti.blockSignals(True)
+        try:
+            self._riempi_tabella_addetti()
+        finally:
+            self.tabella_addetti.blockSignals(False)
+            self.tabella_addetti.setUpdatesEnabled(True)
+
+        # Riapplica il filtro di ricerca se presente
+        if hasattr(self, 'ricerca_addetti_input'):
+            self.filtra_addetti()
+
+    def _riempi_tabella_addetti(self):
+        """Riempie la tabella degli addetti riga per riga"""
         self.tabella_addetti.setRowCount(len(self.manager.addetti))
 
+        # Cache dei nomi minuscoli, riga per riga, usata dal filtro di ricerca
+        self._nomi_addetti_lower = [a.nome.lower() for a in self.manager.addetti]
+
+        # Binding locali: evitano il lookup di attributo a ogni cella
+        setItem = self.tabella_addetti.setItem
+        item = QTableWidgetItem
+
         for i, addetto in enumerate(self.manager.addetti):
             # Riapplica il filtro se è già stato impostato
             if hasattr(self, 'ricerca_addetti_input'):
                 self.tabella_addetti.setRowHidden(i, False)  # Mostra tutte le righe inizialmente
             # Nome
-            self.tabella_addetti.setItem(i, 0, QTableWidgetItem(addetto.nome))
+            setItem(i, 0, item(addetto.nome))
 
             # Ore contratto
-            self.tabella_addetti.setItem(i, 1, QTableWidgetItem(str(addetto.ore_contratto)))
+            setItem(i, 1, item(str(addetto.ore_contratto)))
 
             # Ore max
-            self.tabella_addetti.setItem(i, 2, QTableWidgetItem(str(addetto.ore_max_settimanale)))
+            setItem(i, 2, item(str(addetto.ore_max_settimanale)))
 
             # Straordinario
-            self.tabella_addetti.setItem(i, 3, QTableWidgetItem("Sì" if addetto.straordinario else "No"))
+            setItem(i, 3, item("Sì" if addetto.straordinario else "No"))
 
             # Giorni riposo
-            giorni_nomi = ["Lun", "Mar", "Mer", "Gio", "Ven", "Sab", "Dom"]
-            giorni_riposo = [giorni_nomi[g] for g in sorted(addetto.giorni_riposo)]
-            self.tabella_addetti.setItem(i, 4, QTableWidgetItem(", ".join(giorni_riposo) if giorni_riposo else "-"))
-
-        # Riapplica il filtro di ricerca se presente
-        if hasattr(self, 'ricerca_addetti_input'):
-            self.filtra_addetti()
+            giorni_riposo = [_GIORNI_ABBREV[g] for g in sorted(addetto.giorni_riposo)]
+            setItem(i, 4, item(", ".join(giorni_riposo) if giorni_riposo else "-"))
 
     def aggiungi_turno(self):
         """Apre il dialog per aggiungere un turno"""
@@ -539,7 +662,7 @@ class FinestraPrincipale(QMainWindow):
         if dialog.exec() == QDialog.DialogCode.Accepted:
             if dialog.turno:
                 # Controlla duplicati
-                if any(t.nome.lower() == dialog.turno.nome.lower() for t in self.manager.turni):
+                if dialog.turno.nome.lower() in self.manager.nomi_turni_lower():
                     QMessageBox.warning(self, "Errore", "Turno già esistente!")
                     return
 
@@ -580,25 +703,41 @@ class FinestraPrincipale(QMainWindow):
 
     def aggiorna_tabella_turni(self):
         """Aggiorna la tabella dei turni"""
-        self.tabella_turni.setRowCount(len(self.manager.turni))
+        # Sospende repaint e segnali durante il riempimento massivo
+        self.tabella_turni.setUpdatesEnabled(False)
+        self.tabella_turni.blockSignals(True)
+        try:
+            self.tabella_turni.setRowCount(len(self.manager.turni))
 
-        for i, turno in enumerate(self.manager.turni):
-            self.tabella_turni.setItem(i, 0, QTableWidgetItem(turno.nome))
-            self.tabella_turni.setItem(i, 1, QTableWidgetItem(turno.ora_inizio))
-            self.tabella_turni.setItem(i, 2, QTableWidgetItem(turno.ora_fine))
-            self.tabella_turni.setItem(i, 3, QTableWidgetItem(f"{turno.ore}h"))
+            # Binding locali: evitano il lookup di attributo a ogni cella
+            setItem = self.tabella_turni.setItem
+            item = QTableWidgetItem
+
+            for i, turno in enumerate(self.manager.turni):
+                setItem(i, 0, item(turno.nome))
+                setItem(i, 1, item(turno.ora_inizio))
+                setItem(i, 2, item(turno.ora_fine))
+                setItem(i, 3, item(f"{turno.ore}h"))
+        finally:
+            self.tabella_turni.blockSignals(False)
+            self.tabella_turni.setUpdatesEnabled(True)
 
     def aggiorna_mese(self):
         """Aggiorna il mese nel manager"""
         self.manager.mese = self.mese_combo.currentIndex() + 1
-        # Auto-aggiorna statistiche quando cambia il mese
-        self.aggiorna_statistiche()
+        self._richiedi_aggiornamento_statistiche()
 
     def aggiorna_anno(self):
         """Aggiorna l'anno nel manager"""
         self.manager.anno = self.anno_spin.value()
-        # Auto-aggiorna statistiche quando cambia l'anno
-        self.aggiorna_statistiche()
+        self._richiedi_aggiornamento_statistiche()
+
+    def _richiedi_aggiornamento_statistiche(self):
+        """Auto-aggiorna le statistiche quando cambia mese/anno (con debounce)"""
+        # Senza pianificazione non c'è nulla da ricalcolare
+        if not self.manager.pianificazione:
+            return
+        self._timer_statistiche.start()
 
     def pianifica_turni(self):
         """Avvia la pianificazione dei turni"""
@@ -612,9 +751,10 @@ class FinestraPrincipale(QMainWindow):
 
         if self.manager.pianifica_turni():
             # Calcola statistiche per il messaggio di successo
-            giorni_pianificati = len([d for d in self.manager.pianificazione if self.manager.pianificazione[d]])
-            giorni_totali = len(self.manager.pianificazione)
-            addetti_con_turni = len(set([nome for d in self.manager.pianificazione for nome in self.manager.pianificazione[d]]))
+            pianificazione = self.manager.pianificazione
+            giorni_pianificati = sum(1 for assegnazioni in pianificazione.values() if assegnazioni)
+            giorni_totali = len(pianificazione)
+            addetti_con_turni = len({nome for assegnazioni in pianificazione.values() for nome in assegnazioni})
 
             messaggio = f"""Pianificazione completata con successo!
 
@@ -634,121 +774,105 @@ class FinestraPrincipale(QMainWindow):
 
     def aggiorna_pianificazione(self):
         """Aggiorna la tabella della pianificazione"""
+        self._costruisci_tab(2)
         if not self.manager.pianificazione:
-            self.tabella_pianificazione.setRowCount(0)
+            self.modello_pianificazione.imposta_righe([])
             return
 
-        giorni = self.manager.get_giorni_mese()
-        righe = 0
-
-        # Conta le righe necessarie
-        for data in giorni:
-            assegnazioni = self.manager.pianificazione.get(data, {})
-            if assegnazioni:
-                righe += len(assegnazioni)
-            else:
-                righe += 1
+        righe = []
+        # Etichette "Nome (inizio-fine)" costruite una volta per turno,
+        # come fa esporta_excel
+        etichette_turno = {}
+        pianificazione_get = self.manager.pianificazione.get
+        for data in self.manager.get_giorni_mese():
+            assegnazioni = pianificazione_get(data, {})
 
-        self.tabella_pianificazione.setRowCount(righe)
+            # Valori costanti per giorno, calcolati una volta sola
+            data_str = data.strftime("%d/%m/%Y")
+            giorno_str = self.manager._nome_giorno_italiano(data.weekday())
 
-        riga = 0
-        for data in giorni:
-            assegnazioni = self.manager.pianificazione.get(data, {})
-
-            # Colore
+            # Colore (None per i giorni normali: sfondo di default)
             if self.manager.is_festivo(data):
-                colore = QColor(255, 200, 200)
+                colore = _COL_FESTIVO
             elif self.manager.is_domenica(data):
-                colore = QColor(255, 255, 200)
+                colore = _COL_DOMENICA
             else:
-                colore = QColor(255, 255, 255)
+                colore = None
 
             if assegnazioni:
                 for nome_addetto, turno in assegnazioni.items():
-                    data_str = data.strftime("%d/%m/%Y")
-                    giorno_str = self.manager._nome_giorno_italiano(data.weekday())
-                    turno_str = f"{turno.nome} ({turno.ora_inizio}-{turno.ora_fine})"
-
-                    item_data = QTableWidgetItem(data_str)
-                    item_data.setBackground(colore)
-                    item_giorno = QTableWidgetItem(giorno_str)
-                    item_giorno.setBackground(colore)
-                    item_addetto = QTableWidgetItem(nome_addetto)
-                    item_addetto.setBackground(colore)
-                    item_turno = QTableWidgetItem(turno_str)
-                    item_turno.setBackground(colore)
-
-                    self.tabella_pianificazione.setItem(riga, 0, item_data)
-                    self.tabella_pianificazione.setItem(riga, 1, item_giorno)
-                    self.tabella_pianificazione.setItem(riga, 2, item_addetto)
-                    self.tabella_pianificazione.setItem(riga, 3, item_turno)
-
-                    riga += 1
+                    turno_str = etichette_turno.get(turno.nome)
+                    if turno_str is None:
+                        turno_str = f"{turno.nome} ({turno.ora_inizio}-{turno.ora_fine})"
+                        etichette_turno[turno.nome] = turno_str
+                    righe.append((data_str, giorno_str, nome_addetto, turno_str, colore))
             else:
-                data_str = data.strftime("%d/%m/%Y")
-                giorno_str = self.manager._nome_giorno_italiano(data.weekday())
-
-                item_data = QTableWidgetItem(data_str)
-                item_data.setBackground(colore)
-                item_giorno = QTableWidgetItem(giorno_str)
-                item_giorno.setBackground(colore)
-                item_none = QTableWidgetItem("-")
-                item_none.setBackground(colore)
-                item_turno = QTableWidgetItem("Nessun turno")
-                item_turno.setBackground(colore)
-
-                self.tabella_pianificazione.setItem(riga, 0, item_data)
-                self.tabella_pianificazione.setItem(riga, 1, item_giorno)
-                self.tabella_pianificazione.setItem(riga, 2, item_none)
-                self.tabella_pianificazione.setItem(riga, 3, item_turno)
+                righe.append((data_str, giorno_str, "-", "Nessun turno", colore))
 
-                riga += 1
+        self.modello_pianificazione.imposta_righe(righe)
 
     def aggiorna_statistiche(self):
         """Aggiorna le statistiche"""
+        self._costruisci_tab(3)
         if not self.manager.pianificazione:
-            self.statistiche_text.setText("Nessuna pianificazione disponibile")
+            self.statistiche_text.setPlainText("Nessuna pianificazione disponibile")
             return
 
         stats = self.manager.genera_statistiche()
 
-        testo = "=== STATISTICHE PIANIFICAZIONE ===\n\n"
+        buf = ["=== STATISTICHE PIANIFICAZIONE ===\n\n"]
 
-        testo += "--- ORE TOTALI PER ADDETTO (mese) ---\n"
+        buf.append("--- ORE TOTALI PER ADDETTO (mese) ---\n")
         for nome, ore in sorted(stats['ore_totali_per_addetto'].items()):
-            testo += f"{nome:20} {ore:5.0f}h totali nel mese\n"
+            buf.append(f"{nome:20} {ore:5.0f}h totali nel mese\n")
 
-        testo += "\n--- ORE PER SETTIMANA ---\n"
+        buf.append("\n--- ORE PER SETTIMANA ---\n")
+        addetti_by_name = self.manager._addetti_by_name
         for nome, ore_settimane in sorted(stats['ore_per_settimana'].items()):
-            addetto = next(a for a in self.manager.addetti if a.nome == nome)
+            addetto = addetti_by_name[nome]
             if ore_settimane:
                 dettagli = ", ".join([f"Sett {s}: {o:.0f}h" for s, o in sorted(ore_settimane.items())])
-                testo += f"{nome:20} {dettagli}\n"
+                buf.append(f"{nome:20} {dettagli}\n")
                 media = sum(ore_settimane.values()) / len(ore_settimane)
-                testo += f"{'':20} Media: {media:.1f}h (contratto: {addetto.ore_contratto}h min, max {addetto.ore_max_settimanale}h)\n"
+                buf.append(f"{'':20} Media: {media:.1f}h (contratto: {addetto.ore_contratto}h min, max {addetto.ore_max_settimanale}h)\n")
 
-        testo += "\n--- GIORNI LAVORATI ---\n"
+        buf.append("\n--- GIORNI LAVORATI ---\n")
         for nome, giorni in sorted(stats['giorni_lavorati_per_addetto'].items()):
-            testo += f"{nome:20} {giorni:3} giorni\n"
+            buf.append(f"{nome:20} {giorni:3} giorni\n")
 
         if stats['dettaglio_domeniche']:
-            testo += "\n--- DOMENICHE LAVORATE ---\n"
+            buf.append("\n--- DOMENICHE LAVORATE ---\n")
             for nome, giorni in sorted(stats['dettaglio_domeniche'].items()):
-                testo += f"{nome:20} {giorni:3} domeniche\n"
+                buf.append(f"{nome:20} {giorni:3} domeniche\n")
 
-        self.statistiche_text.setText(testo)
+        self.statistiche_text.setPlainText("".join(buf))
 
     def esporta_excel(self):
-        """Esporta la pianificazione in Excel"""
+        """Esporta la pianificazione in Excel su un thread del pool"""
         if not self.manager.pianificazione:
             QMessageBox.warning(self, "Errore", "Nessuna pianificazione disponibile")
             return
 
-        try:
-            percorso = self.manager.esporta_excel()
-            QMessageBox.information(self, "Successo", f"File esportato:\n{percorso}")
-        except Exception as e:
-            QMessageBox.critical(self, "Errore", f"Errore durante l'esportazione:\n{str(e)}")
+        # Disabilita il bottone finché l'export non è concluso: evita doppi
+        # avvii e segnala che il lavoro è in corso senza bloccare la GUI
+        self.btn_export_excel.setEnabled(False)
+        # Snapshot sul thread GUI: il worker legge una copia privata, così
+        # ripianificare o modificare gli addetti durante l'export non può
+        # produrre un file incoerente né un "dict changed during iteration"
+        self._export_runnable = ExportRunnable(copy.deepcopy(self.manager))
+        self._export_runnable.segnali.completato.connect(self._export_completato)
+        self._export_runnable.segnali.errore.connect(self._export_fallito)
+        QThreadPool.globalInstance().start(self._export_runnable)
+
+    def _export_completato(self, percorso):
+        """Notifica la fine dell'export (slot sul thread GUI)"""
+        self.btn_export_excel.setEnabled(True)
+        QMessageBox.information(self, "Successo", f"File esportato:\n{percorso}")
+
+    def _export_fallito(self, messaggio):
+        """Notifica un errore di export (slot sul thread GUI)"""
+        self.btn_export_excel.setEnabled(True)
+        QMessageBox.critical(self, "Errore", f"Errore durante l'esportazione:\n{messaggio}")
 
 
 def main():